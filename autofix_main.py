@@ -1,41 +1,433 @@
 #!/usr/bin/env python3
 """
 auto_fix_main.py
-Automatically finds bugs in main.py and fixes them using Ollama.
+Automatically finds bugs in Python files (main.py by default) and fixes them using Ollama.
+
+Usage:
+    python autofix_main.py [FILE_OR_GLOB ...]     e.g. python autofix_main.py "src/*.py"
+
+Files are processed concurrently (one task per file, at most
+OLLAMA_NUM_PARALLEL in flight). To let the Ollama server actually serve
+those requests in parallel, start it with the same settings:
+- OLLAMA_NUM_PARALLEL=4        (concurrent requests per loaded model; files
+                                longer than CHUNK_LINES fan out one request
+                                per chunk, so raise it for large files)
+- OLLAMA_MAX_LOADED_MODELS=1   (keep a single copy of the model in memory)
+- OLLAMA_KEEP_ALIVE=-1         (never unload the model; covers servers or
+                                endpoints that ignore the per-request field)
+
+Every request also sends "keep_alive" (from OLLAMA_KEEP_ALIVE in this
+process's environment, default -1) so the model stays loaded between
+Agent 1 and Agent 2 and across runs.
 """
 
+import argparse
+import asyncio
+import contextlib
+import glob
+import gzip
+import hashlib
+import json
+import math
+import mmap
 import os
+import pickle
+import re
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
 import requests
+from requests.adapters import HTTPAdapter
+
+# Optional: non-blocking file I/O for the async controller
+try:
+    import aiofiles
+    HAS_AIOFILES = True
+except Exception:
+    HAS_AIOFILES = False
+
+# Optional: C-accelerated JSON parsing
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except Exception:
+    json_loads = json.loads
+
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
 
 # -------------------- CONFIG -------------------- #
 OLLAMA_URL = "http://127.0.0.1:11434"  # your local Ollama server
 MODEL_NAME = "deepseek-r1"             # Ollama model
 INPUT_FILE = "main.py"
-OUTPUT_FILE = "main_fixed.py"
+OUTPUT_SUFFIX = "_fixed"               # main.py -> main_fixed.py
+REQUEST_TIMEOUT = 120                  # seconds per Ollama call (read timeout)
+CONNECT_TIMEOUT = 5                    # seconds to establish a connection
+MAX_ATTEMPTS = 3                       # tries per generation on transient failures
+MAX_NUM_PREDICT = 8192                 # ceiling when a reply that hit its token limit is retried
+# gzip request bodies; only for servers/proxies that decode Content-Encoding: gzip
+# (stock Ollama does not), e.g. a remote Ollama behind a decompressing proxy
+GZIP_REQUESTS = os.environ.get("OLLAMA_GZIP_REQUESTS", "0") == "1"
+NUM_PARALLEL = int(os.environ.get("OLLAMA_NUM_PARALLEL", "4"))  # files in flight at once
+COMBINED_AGENTS = True                 # one analyze+fix generation instead of finder -> fixer
+CHUNK_LINES = 200                      # files longer than this are bug-checked per chunk
+CHUNK_OVERLAP = 20                     # lines shared by neighbouring chunks
+_keep_alive = os.environ.get("OLLAMA_KEEP_ALIVE", "-1")
+# Ollama reads bare numbers as seconds (negative = forever) and strings as durations ("30m")
+KEEP_ALIVE = int(_keep_alive) if _keep_alive.lstrip("-").isdigit() else _keep_alive
+CACHE_DIR = Path(".autofix_cache")     # completions cached by sha256(model + prompt)
+EMBED_MODEL = "nomic-embed-text"       # local embedding model for the semantic cache
+SEMANTIC_THRESHOLD = 0.92              # cosine similarity needed for a semantic hit
 
+# One pooled, keep-alive session shared by both agents (and all worker threads)
+SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=0)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+SESSION.headers.update({"Connection": "keep-alive", "Accept-Encoding": "gzip, deflate"})
 
-# -------------------- AGENT 1: BUG FINDER -------------------- #
-def bug_finder(code: str) -> str:
+
+# -------------------- PRE-WARM -------------------- #
+PREWARM_JOIN_TIMEOUT = 10  # max seconds the first agent call waits for the warm-up
+
+
+def _prewarm_worker():
+    try:
+        # Open the pooled connection, then load the model with a 1-token generation
+        SESSION.head(OLLAMA_URL, timeout=5)
+        SESSION.post(f"{OLLAMA_URL}/api/generate", json={
+            "model": MODEL_NAME,
+            "prompt": "",
+            "keep_alive": KEEP_ALIVE,
+            "options": {"num_predict": 1}
+        }, timeout=REQUEST_TIMEOUT)
+    except Exception:
+        pass  # warm-up is best effort; the real call will surface errors
+
+
+def _prewarm() -> threading.Thread:
+    thread = threading.Thread(target=_prewarm_worker, daemon=True)
+    thread.start()
+    return thread
+
+
+_PREWARM_THREAD = _prewarm()
+
+
+# -------------------- RESPONSE CACHE -------------------- #
+def _cache_key(prompt: str, system: str = "") -> str:
+    return hashlib.sha256(f"{MODEL_NAME}\0{system}\0{prompt}".encode()).hexdigest()
+
+
+def _cache_get(key: str):
+    """Return the cached completion for key, or None on a miss."""
+    try:
+        return (CACHE_DIR / f"{key}.txt").read_text(encoding="utf-8")
+    except OSError:
+        return None
+
+
+def _cache_set(key: str, val: str):
+    CACHE_DIR.mkdir(exist_ok=True)
+    # unique temp file per call: worker threads may store the same key at once (e.g. empty __init__.py files)
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=CACHE_DIR, prefix=f"{key}.",
+                                     suffix=".tmp", delete=False) as tmp:
+        tmp.write(val)
+    os.replace(tmp.name, CACHE_DIR / f"{key}.txt")
+
+
+# -------------------- SEMANTIC CACHE -------------------- #
+_SEMANTIC_FILE = CACHE_DIR / f"semantic-{EMBED_MODEL}.pkl"
+_semantic_lock = threading.Lock()
+_semantic_store = None  # list of (scope, unit embedding, completion), loaded on first use
+
+
+def embed(text: str) -> list[float]:
+    """Embed text with the local Ollama embedding model, normalized to unit length."""
+    response = SESSION.post(f"{OLLAMA_URL}/api/embed", json={
+        "model": EMBED_MODEL,
+        "input": text
+    }, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    vec = json_loads(response.content)["embeddings"][0]
+    norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+    return [x / norm for x in vec]
+
+
+def _semantic_entries() -> list:
+    global _semantic_store
+    if _semantic_store is None:
+        try:
+            with open(_SEMANTIC_FILE, "rb") as f:
+                _semantic_store = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            _semantic_store = []
+    return _semantic_store
+
+
+def _semantic_get(scope: str, vec: list[float]):
+    """Return the completion of the most similar cached prompt in scope, if similar enough."""
+    with _semantic_lock:
+        best, best_sim = None, SEMANTIC_THRESHOLD
+        for other_scope, other, completion in _semantic_entries():
+            if other_scope != scope:
+                continue
+            sim = sum(a * b for a, b in zip(vec, other))
+            if sim >= best_sim:
+                best, best_sim = completion, sim
+        return best
+
+
+def _semantic_add(scope: str, vec: list[float], completion: str):
+    with _semantic_lock:
+        entries = _semantic_entries()
+        entries.append((scope, vec, completion))
+        CACHE_DIR.mkdir(exist_ok=True)
+        tmp = _SEMANTIC_FILE.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp, "wb") as f:
+            pickle.dump(entries, f)
+        os.replace(tmp, _SEMANTIC_FILE)
+
+
+def _cache_lookup(prompt: str, system: str = "", semantic_scope: str = None):
     """
-    Identify bugs, errors, and logical issues in the code.
-    Returns a structured bug report.
+    Check the exact cache, then (only when semantic_scope is given) the
+    semantic cache. Semantic matches are only looked up among prompts sent
+    with the same system instructions and the same semantic_scope.
+    Returns (key, probe, completion); completion is None on a miss and probe
+    is what _cache_store needs to record the new completion semantically.
     """
-    prompt = f"""
-You are a Python code bug detection assistant.
-Analyze the following code carefully and identify all bugs, errors, and logical issues.
-Provide line numbers and explanations for each issue.
+    key = _cache_key(prompt, system)
+    cached = _cache_get(key)
+    if cached is not None or semantic_scope is None:
+        return key, None, cached
 
-Code:
-{code}
+    scope = hashlib.sha256(f"{system}\0{semantic_scope}".encode()).hexdigest()[:16]
+    try:
+        vec = embed(prompt)
+    except Exception:
+        # embedding model unavailable: fall back to exact matching only
+        return key, None, None
+    return key, (scope, vec), _semantic_get(scope, vec)
 
-Return only the bug report.
-"""
-    response = requests.post(f"{OLLAMA_URL}/v1/completions", json={
+
+def _cache_store(key: str, probe, completion: str):
+    _cache_set(key, completion)
+    if probe is not None:
+        _semantic_add(*probe, completion)
+
+
+# -------------------- STREAMING GENERATE -------------------- #
+class TruncatedCompletion(RuntimeError):
+    """The model stopped because it ran out of num_predict tokens (done_reason == "length")."""
+
+
+def num_predict_for(code: str, cap: int, factor: float = 1.5) -> int:
+    """
+    Token budget for a generation about code: proportional to the input size
+    (~4 chars per token) so small files stop early, but never above cap.
+    """
+    est_tokens = len(code) // 4
+    return max(256, min(cap, int(factor * est_tokens) + 128))
+
+
+def stream_generate(prompt: str, num_predict: int, system: str = ""):
+    """
+    Stream a completion from Ollama's native /api/generate endpoint.
+    Yields response text chunks as soon as the server produces them.
+    Raises TruncatedCompletion at the end if the reply was cut off by num_predict.
+    """
+    options = {"num_predict": num_predict, "temperature": 0}
+    body = json_dumps({
         "model": MODEL_NAME,
+        "system": system,
         "prompt": prompt,
-        "max_tokens": 1000
+        "stream": True,
+        "keep_alive": KEEP_ALIVE,
+        "options": options
     })
-    return response.json()["completion"]
+    headers = {"Content-Type": "application/json"}
+    if GZIP_REQUESTS:
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    with SESSION.post(f"{OLLAMA_URL}/api/generate", data=body, headers=headers,
+                      stream=True, timeout=(CONNECT_TIMEOUT, REQUEST_TIMEOUT)) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json_loads(line)
+            if "error" in chunk:
+                # the native API reports mid-stream failures as an error object
+                raise RuntimeError(f"Ollama error: {chunk['error']}")
+            yield chunk.get("response", "")
+            if chunk.get("done"):
+                if chunk.get("done_reason") == "length":
+                    raise TruncatedCompletion(f"reply cut off at num_predict={num_predict}")
+                break
+
+
+# -------------------- PROMPTS -------------------- #
+# Static instructions go first, byte-identical on every call, as the system
+# message: Ollama reuses the KV cache of a matching prompt prefix, so only the
+# code that follows needs prefill on the second and later requests.
+BUG_FINDER_SYSTEM = (
+    "You are a Python code bug detection assistant.\n"
+    "Analyze the code you are given carefully and identify all bugs, errors, and logical issues.\n"
+    "Provide line numbers and explanations for each issue.\n"
+    "Return only the bug report."
+)
+
+END_MARKER = "# === END ==="
+
+BUG_FIXER_SYSTEM = (
+    "You are a Python code repair assistant.\n"
+    "You are given code that has bugs/issues, followed by a bug report.\n"
+    "Rewrite the code to fix all bugs, optimize it, and make it fully executable.\n"
+    "Return only the corrected code, followed by a final line containing exactly: " + END_MARKER
+)
+
+ANALYZE_AND_FIX_SYSTEM = (
+    "You are a Python code bug detection and repair assistant.\n"
+    "Analyze, then rewrite.\n"
+    "First, analyze the code you are given carefully and list all bugs, errors, and logical issues,\n"
+    "with line numbers and explanations for each issue, between <bugs> and </bugs>.\n"
+    "Then rewrite the code to fix all bugs, optimize it, and make it fully executable,\n"
+    "and output only the corrected code between <fixed> and </fixed>."
+)
+
+# Leading reasoning block of thinking models (deepseek-r1); an unclosed one runs to the end
+_THINK = re.compile(r"\A\s*<think>.*?(?:</think>|\Z)\s*", re.S)
+
+# (bug report, fixed code) from a combined reply; tolerates a missing </fixed>
+_SECTIONS = re.compile(r"<bugs>(.*?)</bugs>.*?<fixed>(.*?)(?:</fixed>|\Z)", re.S)
+
+# User-message templates, built once at import. Keep them (and the system
+# strings above) pinned: any whitespace drift changes the prompt bytes and
+# defeats both server-side prefix reuse and the response cache keys.
+FINDER_TEMPLATE = "Code:\n{code}"
+FIXER_TEMPLATE = "Code:\n{code}\n\nBug Report:\n{bug_report}"
+
+
+# -------------------- SHARED GENERATE -------------------- #
+def _log_pool_stats():
+    """Print connection-pool usage, to tell pool exhaustion apart from server failures."""
+    for pool_key in _adapter.poolmanager.pools.keys():
+        pool = _adapter.poolmanager.pools.get(pool_key)
+        if pool is not None:
+            print(f"   pool {pool.host}:{pool.port}: {pool.num_connections} connections opened, "
+                  f"{pool.num_requests} requests, {pool.pool.qsize()}/{pool.pool.maxsize} idle")
+
+
+def _answer_start(text: str):
+    """
+    Index where the answer starts in a partial completion: after a leading
+    <think> block. None while the model may still be reasoning.
+    """
+    head = text.lstrip()
+    if head.startswith("<think>"):
+        end = text.find("</think>")
+        return None if end == -1 else end + len("</think>")
+    if "<think>".startswith(head):  # nothing yet, or a partial "<thi"
+        return None
+    return len(text) - len(head)
+
+
+def _collect(prompt: str, max_tokens: int, system: str, stop: list[str]) -> str:
+    """
+    Read one streamed completion, ending it early at a stop sequence.
+    Stop sequences are matched here instead of by the server, and only in the
+    answer: reasoning models repeat the markers named in the instructions
+    while thinking, and a server-side stop would cut them off right there.
+    """
+    text = ""
+    answer_from = search_from = None
+    longest = max(map(len, stop or [""]))
+    with contextlib.closing(stream_generate(prompt, max_tokens, system)) as pieces:
+        for piece in pieces:
+            text += piece
+            if not stop:
+                continue
+            if answer_from is None:
+                answer_from = search_from = _answer_start(text)
+                if answer_from is None:
+                    continue
+            if any(seq in text[search_from:] for seq in stop):
+                break  # closing the stream stops the generation on the server
+            search_from = max(answer_from, len(text) - longest + 1)
+    return text
+
+
+def _stream_with_retries(prompt: str, max_tokens: int, system: str, stop: list[str]) -> str:
+    """Collect one streamed completion, retrying transient connection and server failures."""
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            return _collect(prompt, max_tokens, system, stop)
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError,
+                requests.exceptions.ChunkedEncodingError) as e:  # the last one: connection reset mid-stream
+            status = e.response.status_code if e.response is not None else None
+            if (status is not None and status < 500) or attempt == MAX_ATTEMPTS - 1:
+                # client errors won't fix themselves; otherwise we're out of attempts
+                print(f"❌ Ollama request failed after {attempt + 1} attempt(s): {e}")
+                _log_pool_stats()
+                raise
+            delay = min(10, 2 ** attempt)
+            print(f"⚠️ Ollama request failed ({e}); retrying in {delay}s...")
+            time.sleep(delay)
+
+
+def _generate(prompt: str, max_tokens: int = 1024, system: str = "", stop: list[str] = None,
+              semantic_scope: str = None) -> str:
+    """
+    Single request path for every agent: cache lookup, streamed generation,
+    stop-sequence trimming and cache store.
+    Pass semantic_scope only for outputs that never reproduce code: a
+    semantic hit returns the completion of a different (similar) prompt.
+    A reply cut off by the token limit is retried with a doubled limit (up to
+    MAX_NUM_PREDICT) and never cached or returned; reasoning models can spend
+    a small budget on their <think> block alone.
+    """
+    key, probe, cached = _cache_lookup(prompt, system, semantic_scope)
+    if cached is not None:
+        return cached
+
+    while True:
+        try:
+            completion = _stream_with_retries(prompt, max_tokens, system, stop)
+            if _answer_start(completion) is None:
+                # the reply ended inside the <think> block: there is no answer to use yet
+                raise TruncatedCompletion(f"reply ended while still reasoning at num_predict={max_tokens}")
+            break
+        except TruncatedCompletion:
+            if max_tokens >= MAX_NUM_PREDICT:
+                print(f"❌ Ollama reply still cut off at {max_tokens} tokens; giving up")
+                raise
+            max_tokens = min(MAX_NUM_PREDICT, max_tokens * 2)
+            print(f"⚠️ Ollama reply hit its token limit; retrying with num_predict={max_tokens}...")
+    # reasoning may restate the output format (tags, markers); only the answer after it counts
+    completion = _THINK.sub("", completion, count=1)
+    for seq in stop or ():
+        # drop the stop sequence and anything after it
+        completion = completion.split(seq, 1)[0]
+    completion = completion.rstrip()
+    if not completion:
+        raise RuntimeError("Ollama returned an empty answer")  # never cache or write it
+    _cache_store(key, probe, completion)
+    return completion
+
+
+# -------------------- AGENT 1: BUG FINDER -------------------- #
+def bug_finder(code: str, source: str = None) -> str:
+    """
+    Identify bugs, errors, and logical issues in the code.
+    Returns a structured bug report. source (file path, plus chunk for
+    chunked files) enables semantic reuse of reports for that source only.
+    """
+    return _generate(FINDER_TEMPLATE.format(code=code), num_predict_for(code, 1000), BUG_FINDER_SYSTEM,
+                     semantic_scope=source)
 
 
 # -------------------- AGENT 2: BUG FIXER -------------------- #
@@ -44,55 +436,197 @@ def bug_fixer(code: str, bug_report: str) -> str:
     Repair and optimize the code based on the bug report.
     Returns corrected, executable Python code.
     """
-    prompt = f"""
-You are a Python code repair assistant.
-The following code has bugs/issues:
+    return _generate(FIXER_TEMPLATE.format(code=code, bug_report=bug_report),
+                     num_predict_for(code, 1500), BUG_FIXER_SYSTEM, stop=[END_MARKER])
 
-Code:
-{code}
 
-Bug Report:
-{bug_report}
+# -------------------- COMBINED AGENT: ANALYZE + FIX -------------------- #
+def analyze_and_fix(code: str) -> tuple[str, str]:
+    """
+    Find and fix bugs in a single generation, so the fix is produced in the
+    same pass as the bug report instead of after a second full request.
+    Returns (bug_report, fixed_code).
+    """
+    completion = _generate(FINDER_TEMPLATE.format(code=code),
+                           num_predict_for(code, 2500, factor=2.5), ANALYZE_AND_FIX_SYSTEM,
+                           stop=["</fixed>"])
 
-Rewrite the code to fix all bugs, optimize it, and make it fully executable.
-Return only the corrected code.
-"""
-    response = requests.post(f"{OLLAMA_URL}/v1/completions", json={
-        "model": MODEL_NAME,
-        "prompt": prompt,
-        "max_tokens": 1500
-    })
-    return response.json()["completion"]
+    match = _SECTIONS.search(completion)
+    if match is None:
+        # model ignored the format: fall back to a dedicated fixer pass
+        return completion.strip(), bug_fixer(code, completion)
+    return match.group(1).strip(), match.group(2).strip()
+
+
+# -------------------- ASYNC WRAPPERS -------------------- #
+async def bug_finder_async(code: str, source: str = None) -> str:
+    """Run bug_finder in a worker thread so several files can be analyzed at once."""
+    return await asyncio.to_thread(bug_finder, code, source)
+
+
+async def bug_fixer_async(code: str, bug_report: str) -> str:
+    """Run bug_fixer in a worker thread so several files can be fixed at once."""
+    return await asyncio.to_thread(bug_fixer, code, bug_report)
+
+
+async def analyze_and_fix_async(code: str) -> tuple[str, str]:
+    """Run analyze_and_fix in a worker thread so several files can be processed at once."""
+    return await asyncio.to_thread(analyze_and_fix, code)
+
+
+# -------------------- CHUNKED BUG FINDING -------------------- #
+def line_offsets(buf) -> list[int]:
+    """Byte offset of the start of every line in buf, plus len(buf) as an end sentinel."""
+    offsets = [0]
+    pos = buf.find(b"\n")
+    while pos != -1:
+        offsets.append(pos + 1)
+        pos = buf.find(b"\n", pos + 1)
+    if offsets[-1] != len(buf):
+        offsets.append(len(buf))
+    return offsets
+
+
+def file_chunks(path: str, size: int = CHUNK_LINES, overlap: int = CHUNK_OVERLAP) -> list:
+    """
+    Return (start_line, text) for overlapping windows of size lines (1-based start).
+    The file is memory-mapped and only the bytes of each window are decoded.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return [(1, "")]
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            offsets = line_offsets(mm)
+            num_lines = len(offsets) - 1
+            step = max(1, size - overlap)
+            return [
+                (start + 1, mm[offsets[start]:offsets[min(start + size, num_lines)]].decode("utf-8", "replace"))
+                for start in range(0, max(num_lines - overlap, 1), step)
+            ]
+
+
+async def bug_finder_chunked_async(path: str) -> str:
+    """
+    Find bugs in each chunk of the file concurrently (shorter prompts, cheaper
+    attention) and merge the reports, annotated with each chunk's line range.
+    """
+    parts = await asyncio.to_thread(file_chunks, path)
+    reports = await asyncio.gather(*[bug_finder_async(text, f"{os.path.abspath(path)}:{start}")
+                                     for start, text in parts])
+    merged = []
+    for (start, text), report in zip(parts, reports):
+        end = start + len(text.splitlines()) - 1
+        merged.append(f"### Lines {start}-{end} (line numbers below are relative; add {start - 1})\n{report}")
+    return "\n\n".join(merged)
+
+
+# -------------------- ASYNC FILE I/O -------------------- #
+async def read_text_async(path: str) -> str:
+    if HAS_AIOFILES:
+        async with aiofiles.open(path, "r") as f:
+            return await f.read()
+    return await asyncio.to_thread(Path(path).read_text)
+
+
+async def write_text_async(path: str, text: str):
+    if HAS_AIOFILES:
+        async with aiofiles.open(path, "w") as f:
+            await f.write(text)
+    else:
+        await asyncio.to_thread(Path(path).write_text, text)
 
 
 # -------------------- CONTROLLER -------------------- #
-def improve_file(input_path: str, output_path: str):
+def fixed_path(input_path: str) -> str:
+    """Return the output path for a fixed file, e.g. main.py -> main_fixed.py."""
+    root, ext = os.path.splitext(input_path)
+    return f"{root}{OUTPUT_SUFFIX}{ext}"
+
+
+async def run_one(input_path: str, output_path: str, limit: asyncio.Semaphore = None):
+    """
+    Find and fix bugs in one file. When limit is given, only the Ollama calls
+    hold it, so reads and writes of other files overlap the in-flight requests.
+    """
     if not os.path.exists(input_path):
-        print(f"❌ File not found: {input_path}")
-        return
+        raise FileNotFoundError(f"File not found: {input_path}")
 
     # Read original code
-    with open(input_path, "r") as f:
-        code = f.read()
+    code = await read_text_async(input_path)
 
-    print("🚀 Original Code:\n", code)
+    print(f"🚀 Original Code ({input_path}):\n", code)
 
-    # Agent 1: Find bugs
-    print("\n🔍 Agent 1: Finding bugs...")
-    bug_report = bug_finder(code)
-    print("📝 Bug Report:\n", bug_report)
+    # Give the import-time warm-up a chance to finish loading the model
+    await asyncio.to_thread(_PREWARM_THREAD.join, PREWARM_JOIN_TIMEOUT)
 
-    # Agent 2: Fix code
-    print("\n🛠️ Agent 2: Fixing code...")
-    fixed_code = bug_fixer(code, bug_report)
-    print("\n✅ Corrected Code:\n", fixed_code)
+    is_large = code.count("\n") > CHUNK_LINES
+    async with limit or contextlib.nullcontext():
+        if COMBINED_AGENTS and not is_large:
+            # Agents 1 + 2 in one generation
+            print(f"\n🔍🛠️ Finding and fixing bugs in {input_path}...")
+            bug_report, fixed_code = await analyze_and_fix_async(code)
+            print(f"📝 Bug Report ({input_path}):\n", bug_report)
+        else:
+            # Agent 1: Find bugs
+            print(f"\n🔍 Agent 1: Finding bugs in {input_path}...")
+            if is_large:
+                bug_report = await bug_finder_chunked_async(input_path)
+            else:
+                bug_report = await bug_finder_async(code, os.path.abspath(input_path))
+            print(f"📝 Bug Report ({input_path}):\n", bug_report)
+
+            # Agent 2: Fix code
+            print(f"\n🛠️ Agent 2: Fixing {input_path}...")
+            fixed_code = await bug_fixer_async(code, bug_report)
+    print(f"\n✅ Corrected Code ({input_path}):\n", fixed_code)
 
     # Save fixed code
-    with open(output_path, "w") as f:
-        f.write(fixed_code)
+    await write_text_async(output_path, fixed_code)
     print(f"\n💾 Fixed code saved to {output_path}")
 
 
+async def improve_file_async(paths: list[str]) -> list[str]:
+    """
+    Find and fix bugs in every file concurrently, one task per file.
+    At most NUM_PARALLEL files are sent to Ollama at a time so the batch
+    matches what the server will actually run in parallel.
+    A failing file is reported and skipped; the others are still written.
+    Returns the paths that failed.
+    """
+    limit = asyncio.Semaphore(max(1, NUM_PARALLEL))
+    results = await asyncio.gather(*[run_one(p, fixed_path(p), limit) for p in paths],
+                                   return_exceptions=True)
+    failed = []
+    for path, result in zip(paths, results):
+        if isinstance(result, Exception):
+            print(f"❌ Failed to fix {path}: {result}")
+            failed.append(path)
+    return failed
+
+
+def improve_file(input_path: str, output_path: str):
+    asyncio.run(run_one(input_path, output_path))
+
+
+def expand_paths(patterns: list[str]) -> list[str]:
+    """Expand globs (for shells that don't), drop duplicates and previous *_fixed outputs."""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) or [pattern]
+        for path in matches:
+            if Path(path).stem.endswith(OUTPUT_SUFFIX) or path in paths:
+                continue
+            paths.append(path)
+    return paths
+
+
 # -------------------- MAIN -------------------- #
 if __name__ == "__main__":
-    improve_file(INPUT_FILE, OUTPUT_FILE)
+    parser = argparse.ArgumentParser(description="Find and fix bugs in Python files using Ollama.")
+    parser.add_argument("files", nargs="*", default=[INPUT_FILE],
+                        help=f"files or glob patterns to fix (default: {INPUT_FILE})")
+    args = parser.parse_args()
+    failed = asyncio.run(improve_file_async(expand_paths(args.files)))
+    if failed:
+        print(f"\n❌ {len(failed)} file(s) could not be fixed: {', '.join(failed)}")
+        sys.exit(1)
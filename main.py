@@ -1,11 +1,11 @@
 #!/usr/bin/env python3
 """
 swipe_ai_assistant.py
-Single-file PyQt5 app implementing:
+PyQt5 app (pure text helpers live in text_chunks.py) implementing:
 - Floating gradient button with mode switching
 - Translator/clipboard QA mode
 - Document (PDF) upload + QA mode
-- S3 upload + duplicate detection + PDF text extraction (PyPDF2)
+- S3 upload + duplicate detection + PDF text extraction (PDFium via pypdfium2, PyPDF2 fallback)
 - Ollama integration for Q&A with formatted, point-wise answers
 - Draggable, resizable, and fully customizable UI
 
@@ -14,19 +14,28 @@ Requirements:
 - boto3
 - python-dotenv
 - requests
+- orjson (optional, faster JSON decoding of Ollama replies)
+- pypdfium2 (PDF text extraction; PyPDF2 is used if it's missing)
 - PyPDF2
-- pyperclip
 - deep_translator (optional, for translation)
-- fuzzywuzzy (optional, for similarity checks)
+- langdetect (optional, skips translating text already in the target language)
 """
 
 import sys
 import os
 import json
+import hashlib
+import importlib.util
+import multiprocessing
+import threading
 import traceback
-from functools import partial
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
+from io import BytesIO
 from pathlib import Path
-from time import time
+from tempfile import SpooledTemporaryFile
+from time import monotonic, time
 
 # Check for display
 if os.environ.get('DISPLAY') is None:
@@ -51,42 +60,296 @@ AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "localhost")
 OLLAMA_PORT = os.getenv("OLLAMA_PORT", "11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")  # keeps the model (and its prompt cache) loaded
 
 # Fallbacks and sanity
 if not AWS_BUCKET_NAME:
     print("Warning: AWS_BUCKET_NAME not set in .env — S3 upload will fail until configured.")
 
 # --- Imports for functionality ---
-import boto3
+# boto3, PyPDF2, deep_translator and numpy are imported on first use, so the floating
+# button comes up without loading them (boto3 alone costs hundreds of ms at startup)
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from text_chunks import chunk_paragraphs, split_for_translation, top_k_indices
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QTextEdit, QComboBox,
     QVBoxLayout, QPushButton, QHBoxLayout, QCheckBox,
     QLineEdit, QMenu, QFileDialog, QLabel, QFrame, QSizeGrip
 )
-from PyQt5.QtCore import Qt, QTimer, QPoint, QThread, pyqtSignal, QPropertyAnimation, QRect, QEasingCurve, QSize
-from PyQt5.QtGui import QFont, QPainter, QColor, QPen, QLinearGradient, QBrush, QCursor
+from PyQt5.QtCore import (
+    Qt, QTimer, QPoint, QThread, QObject, QRunnable, QThreadPool, pyqtSignal,
+    QPropertyAnimation, QRect, QEasingCurve, QSize
+)
+from PyQt5.QtGui import QFont, QPainter, QPixmap, QColor, QPen, QLinearGradient, QBrush, QCursor, QTextCursor
 
 # Optional libs
-try:
-    from deep_translator import GoogleTranslator
-    HAS_TRANSLATOR = True
-except Exception:
-    HAS_TRANSLATOR = False
+HAS_TRANSLATOR = importlib.util.find_spec("deep_translator") is not None
 
-try:
-    from fuzzywuzzy import fuzz
-    HAS_FUZZY = True
-except Exception:
-    HAS_FUZZY = False
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+
+HAS_LANGDETECT = importlib.util.find_spec("langdetect") is not None
 
 try:
-    import pyperclip
-    HAS_PYPERCLIP = True
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
 except Exception:
-    HAS_PYPERCLIP = False
+    json_loads = json.loads
+
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+HAS_PDFIUM = importlib.util.find_spec("pypdfium2") is not None  # native PDFium text extraction
+
+# ----------------- Stylesheets -----------------
+# Built once at import; widgets reference these instead of rebuilding literals per call.
+_STYLE_MENU_CONTEXT = """
+    QMenu {
+        background-color: #1e1e2e;
+        color: white;
+        border: 2px solid #6a11cb;
+        border-radius: 8px;
+        padding: 5px;
+    }
+    QMenu::item {
+        padding: 8px 20px;
+        border-radius: 4px;
+    }
+    QMenu::item:selected {
+        background-color: #6a11cb;
+    }
+"""
 
-from PyPDF2 import PdfReader
+_STYLE_MODE_BTN = """
+    QPushButton {
+        background:#1e2030;
+        color:white;
+        border:2px solid #2e3040;
+        border-radius:8px;
+        padding:10px 20px;
+        font-weight:600;
+    }
+    QPushButton:checked {
+        background:#6a11cb;
+        border-color:#6a11cb;
+    }
+    QPushButton:hover {
+        background:#2e3550;
+    }
+"""
+
+_STYLE_HEADER_BTN = """
+    QPushButton {
+        background:#2e3040;
+        color:white;
+        border:none;
+        border-radius:6px;
+        font-weight:bold;
+    }
+    QPushButton:hover {
+        background:#ff5252;
+    }
+"""
+
+_STYLE_MENU_SETTINGS = """
+    QMenu {
+        background-color: #1e1e2e;
+        color: white;
+        border: 2px solid #9c27b0;
+        border-radius: 8px;
+        padding: 8px;
+    }
+    QMenu::item {
+        padding: 10px 30px;
+        border-radius: 4px;
+    }
+    QMenu::item:selected {
+        background-color: #9c27b0;
+    }
+    QMenu::separator {
+        height: 1px;
+        background: #444;
+        margin: 5px 10px;
+    }
+"""
+
+_STYLE_COMBO_TRANSLATE = """
+    QComboBox {
+        background:#1e2030;
+        color:white;
+        padding:10px;
+        border:2px solid #2e3040;
+        border-radius:8px;
+        font-size:13px;
+    }
+    QComboBox:hover {
+        border-color:#6a11cb;
+    }
+    QComboBox::drop-down {
+        border:none;
+    }
+    QComboBox QAbstractItemView {
+        background:#1e2030;
+        color:white;
+        selection-background-color:#6a11cb;
+    }
+"""
+
+_STYLE_TEXT_TRANSLATE = """
+    QTextEdit {
+        background:#12141f;
+        color:#ffffff;
+        border:2px solid #2e3040;
+        border-radius:8px;
+        padding:15px;
+        font-size:14px;
+        line-height:1.6;
+    }
+"""
+
+_STYLE_INPUT_TRANSLATE = """
+    QLineEdit {
+        background:#1e2030;
+        color:white;
+        padding:10px;
+        border:2px solid #2e3040;
+        border-radius:8px;
+    }
+    QLineEdit:focus {
+        border-color:#6a11cb;
+    }
+"""
+
+_STYLE_BTN_TRANSLATE_SEND = """
+    QPushButton {
+        background:#6a11cb;
+        color:white;
+        border:none;
+        padding:10px 20px;
+        border-radius:8px;
+        font-weight:600;
+    }
+    QPushButton:hover {
+        background:#8a31eb;
+    }
+    QPushButton:pressed {
+        background:#5a01bb;
+    }
+"""
+
+_STYLE_BTN_UPLOAD = """
+    QPushButton {
+        background:#1976d2;
+        color:white;
+        border:none;
+        padding:12px 20px;
+        border-radius:8px;
+        font-weight:600;
+    }
+    QPushButton:hover {
+        background:#1e88e5;
+    }
+    QPushButton:pressed {
+        background:#1565c0;
+    }
+"""
+
+_STYLE_COMBO_DOCUMENT = """
+    QComboBox {
+        background:#1e2030;
+        color:white;
+        padding:8px;
+        border:2px solid #2e3040;
+        border-radius:8px;
+    }
+    QComboBox:hover {
+        border-color:#4caf50;
+    }
+    QComboBox::drop-down {
+        border:none;
+    }
+"""
+
+_STYLE_TEXT_DOCUMENT = """
+    QTextEdit {
+        background:#12141f;
+        color:white;
+        border:2px solid #2e3040;
+        border-radius:8px;
+        padding:10px;
+        font-size:13px;
+    }
+"""
+
+_STYLE_INPUT_DOCUMENT = """
+    QLineEdit {
+        background:#1e2030;
+        color:white;
+        padding:10px;
+        border:2px solid #2e3040;
+        border-radius:8px;
+    }
+    QLineEdit:focus {
+        border-color:#4caf50;
+    }
+"""
+
+_STYLE_BTN_DOCUMENT_SEND = """
+    QPushButton {
+        background:#4caf50;
+        color:white;
+        border:none;
+        padding:10px 20px;
+        border-radius:8px;
+        font-weight:600;
+    }
+    QPushButton:hover:enabled {
+        background:#66bb6a;
+    }
+    QPushButton:pressed:enabled {
+        background:#388e3c;
+    }
+    QPushButton:disabled {
+        background:#2e3040;
+        color:#666666;
+    }
+"""
+
+_STYLE_HEADER_BTN_SETTINGS = _STYLE_HEADER_BTN.replace("#ff5252", "#9c27b0")
+_STYLE_HEADER_BTN_MINIMIZE = _STYLE_HEADER_BTN.replace("#ff5252", "#ffa726")
+_STYLE_HEADER_BTN_CLEAR = _STYLE_HEADER_BTN.replace("#ff5252", "#42a5f5")
+_STYLE_FIELD_LABEL = "color:#aaaaaa; font-size:12px; margin-top:10px;"
+
+# ----------------- Prompt rules -----------------
+# Fixed instruction lines, joined once at import; prompts only format their dynamic parts.
+_TRANSLATE_RULES = (
+    "1. Provide detailed, comprehensive answers with multiple paragraphs",
+    "2. Structure your answer in point-wise format with clear numbered points",
+    "3. Each point should be detailed (3-5 sentences minimum)",
+    "4. Include examples, explanations, and context where relevant",
+    "5. Use ONLY the information from the copied text below",
+    "6. If the copied text doesn't contain enough information to answer, clearly state what's missing",
+)
+_TRANSLATE_RULES_TEXT = "\n".join(_TRANSLATE_RULES)
+
+_DOCUMENT_RULES = (
+    "You are an expert document analyst. You must answer STRICTLY based on the document content provided above.",
+    "",
+    "CRITICAL RULES:",
+    "1. Answer ONLY using information from the provided document text",
+    "2. If the answer is not in the document, clearly state: "
+    "'This information is not available in the provided document'",
+    "3. DO NOT use external knowledge or make assumptions beyond the document",
+    "4. Provide detailed, comprehensive answers (minimum 150-200 words)",
+    "5. Structure your answer in clear numbered points (use 1., 2., 3., etc.)",
+    "6. Each point should include detailed explanation (3-5 sentences)",
+    "7. Include relevant examples or quotes from the document",
+    "8. Add a summary or conclusion at the end",
+    "9. If the document contains tables, lists, or structured data, present them clearly",
+)
+_DOCUMENT_RULES_TEXT = "\n".join(_DOCUMENT_RULES)
 
 # ----------------- Utility functions -----------------
 def format_ollama_answer(raw_text: str) -> str:
@@ -101,72 +364,764 @@ def format_ollama_answer(raw_text: str) -> str:
     # Return formatted text as-is (Ollama will handle formatting based on our prompt)
     return text
 
-# ----------------- S3 Upload Thread -----------------
-class UploadThread(QThread):
+
+# UI language names -> ISO 639-1 codes as reported by langdetect
+_iso_map = {
+    "english": "en", "hindi": "hi", "spanish": "es", "french": "fr", "german": "de",
+    "chinese": "zh", "arabic": "ar", "japanese": "ja", "russian": "ru", "portuguese": "pt",
+    "italian": "it", "korean": "ko", "turkish": "tr", "dutch": "nl", "polish": "pl",
+}
+LANGDETECT_MIN_CHARS = 20   # shorter snippets are detected too unreliably to skip on
+LANGDETECT_MIN_PROB = 0.9
+_langdetect_lock = threading.Lock()
+_langdetect_ready = False
+
+
+def _init_langdetect():
+    """Load langdetect's language profiles once, under a lock.
+
+    langdetect builds its global factory lazily and without locking, so a first call racing
+    from several translate workers could detect with only some profiles loaded.
+    """
+    global _langdetect_ready
+    if _langdetect_ready:
+        return
+    with _langdetect_lock:
+        if not _langdetect_ready:
+            from langdetect import DetectorFactory, detector_factory
+            DetectorFactory.seed = 0  # langdetect is randomized; keep its answers stable
+            detector_factory.init_factory()
+            _langdetect_ready = True
+
+
+def _already_in(text, lang):
+    """True when langdetect is confident text is already written in lang, so translating is a no-op."""
+    code = _iso_map.get(lang)
+    if not HAS_LANGDETECT or code is None or len(text) < LANGDETECT_MIN_CHARS:
+        return False
+    _init_langdetect()
+    from langdetect import detect_langs
+    try:
+        best = detect_langs(text)[0]
+    except Exception:
+        return False
+    return best.lang.split("-")[0] == code and best.prob >= LANGDETECT_MIN_PROB
+
+
+# Translations, keyed on (blake2b(text), language) so long source texts aren't kept as keys
+TRANSLATE_CACHE_SIZE = 2048
+_translate_cache = OrderedDict()
+_translate_cache_lock = threading.Lock()  # filled from translate/Ollama worker threads
+
+# One GoogleTranslator per target language and thread: construction validates the language
+# list each time, and instances can't be shared across threads (translate() stores the
+# query on the instance)
+_translator_local = threading.local()
+
+
+def _get_translator(lang):
+    cache = getattr(_translator_local, "by_target", None)
+    if cache is None:
+        cache = _translator_local.by_target = {}
+    translator = cache.get(lang)
+    if translator is None:
+        from deep_translator import GoogleTranslator
+        translator = cache[lang] = GoogleTranslator(source='auto', target=lang)
+    return translator
+
+
+def _translate_cache_key(text, lang):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest(), lang
+
+
+def _translate_cache_get(key):
+    with _translate_cache_lock:
+        translated = _translate_cache.get(key)
+        if translated is not None:
+            _translate_cache.move_to_end(key)
+        return translated
+
+
+def _translate_cache_peek(text, lang):
+    """The cached translation of text, or None; never touches the network."""
+    return _translate_cache_get(_translate_cache_key(text, lang))
+
+
+def _translate_cached(text: str, lang: str) -> str:
+    """Translate text to lang, memoized so repeated snippets/language toggles skip the network."""
+    key = _translate_cache_key(text, lang)
+    translated = _translate_cache_get(key)
+    if translated is not None:
+        return translated
+
+    if _already_in(text, lang):
+        translated = text  # e.g. the model already answered in the target language
+    else:
+        translated = _get_translator(lang).translate(text)
+    with _translate_cache_lock:
+        _translate_cache[key] = translated
+        while len(_translate_cache) > TRANSLATE_CACHE_SIZE:
+            _translate_cache.popitem(last=False)
+    return translated
+
+
+# Document-mode answers, keyed on (model, document digest, question, language)
+OLLAMA_ANSWER_CACHE_SIZE = 128
+_ollama_answer_cache = OrderedDict()
+
+
+def _answer_cache_get(key):
+    answer = _ollama_answer_cache.get(key)
+    if answer is not None:
+        _ollama_answer_cache.move_to_end(key)
+    return answer
+
+
+def _answer_cache_put(key, answer):
+    _ollama_answer_cache[key] = answer
+    _ollama_answer_cache.move_to_end(key)
+    while len(_ollama_answer_cache) > OLLAMA_ANSWER_CACHE_SIZE:
+        _ollama_answer_cache.popitem(last=False)
+
+
+# ----------------- PDF extraction helpers -----------------
+PARALLEL_EXTRACT_MIN_PAGES = 10   # below this, a worker pool costs more than it saves
+PROCESS_EXTRACT_MIN_PAGES = 50    # from here on, use processes (PyPDF2 is pure Python, GIL-bound)
+EXTRACT_CHUNK_PAGES = 50          # pages per process task
+EXTRACT_PROGRESS_EVERY = 25       # pages between progress messages
+SPOOL_MAX_BYTES = 16 * 1024 * 1024  # extracted text kept in RAM up to this, then spilled to disk
+ENCODE_SLICE_CHARS = 1024 * 1024  # chars encoded per write when spooling text
+PDFIUM_PROCESS_MIN_PAGES = 500    # PDFium is fast enough in-process below this (and isn't thread-safe)
+_reader_local = threading.local()
+_PDFIUM_LOCK = threading.Lock()   # PDFium is not thread-safe: one call into it at a time per process
+
+
+def _pdf_reader(path):
+    from PyPDF2 import PdfReader
+    return PdfReader(path)
+
+
+def _extract_page(i, path):
+    """Extract one page's text; each worker thread keeps its own PdfReader (they aren't thread-safe)."""
+    if getattr(_reader_local, "path", None) != path:
+        _reader_local.reader = _pdf_reader(path)
+        _reader_local.path = path
+    return i, _reader_local.reader.pages[i].extract_text() or ""
+
+
+def _pdfium_page_count(path):
+    import pypdfium2 as pdfium
+    with _PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+
+def _pdfium_range(path, start, end):
+    """Extract pages [start, end) with PDFium; returns their text joined in order."""
+    import pypdfium2 as pdfium
+    with _PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(path)
+        try:
+            parts = []
+            for i in range(start, end):
+                page = pdf[i]
+                textpage = page.get_textpage()
+                parts.append(textpage.get_text_range().replace("\r\n", "\n"))
+                parts.append("\n\n")
+                textpage.close()
+                page.close()
+            return "".join(parts)
+        finally:
+            pdf.close()
+
+
+def _extract_range(path, start, end):
+    """Extract pages [start, end) in a worker process; returns their text joined in order."""
+    if HAS_PDFIUM:
+        return _pdfium_range(path, start, end)
+    reader = _pdf_reader(path)
+    return "".join((reader.pages[i].extract_text() or "") + "\n\n" for i in range(start, end))
+
+
+# ----------------- Translation worker -----------------
+class TranslateSignals(QObject):
+    done = pyqtSignal(str, str, str)    # (text, lang, translated)
+    failed = pyqtSignal(str, str, str)  # (text, lang, error)
+
+
+class TranslateWorker(QRunnable):
+    """Runs one (memoized, split if long) translation on the global thread pool, off the GUI thread."""
+
+    def __init__(self, text, lang, signals):
+        super().__init__()
+        self.text = text
+        self.lang = lang
+        self.signals = signals
+
+    def run(self):
+        try:
+            self.signals.done.emit(self.text, self.lang, _translate_long(self.text, self.lang))
+        except Exception as e:
+            self.signals.failed.emit(self.text, self.lang, str(e))
+
+
+# ----------------- Ollama chat worker -----------------
+OLLAMA_CHAT_URL = f"http://{OLLAMA_HOST}:{OLLAMA_PORT}/api/chat"
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def system_message(prompt):
+    """JSON-encode a system message once, so a large (document) prompt isn't re-serialized per request."""
+    return json_dumps({"role": "system", "content": prompt})
+
+
+def chat_payload(messages, options, stream=True, **extra):
+    """Encode an /api/chat body; messages may mix dicts and pre-encoded bytes from system_message()."""
+    head = json_dumps({"model": OLLAMA_MODEL, "stream": stream, "options": options,
+                       "keep_alive": OLLAMA_KEEP_ALIVE, **extra})
+    encoded = b",".join(m if isinstance(m, bytes) else json_dumps(m) for m in messages)
+    return head[:-1] + b',"messages":[' + encoded + b"]}"
+
+
+STREAM_EMIT_INTERVAL = 0.05  # seconds between streamed UI updates
+OLLAMA_CONNECT_TIMEOUT = 3  # seconds; a local server that doesn't accept within this is down
+
+# Keep-alive connection pool shared by every Ollama request.
+# Retries only cover failed connects (urllib3 doesn't replay POST bodies after a read error).
+_OLLAMA_SESSION = requests.Session()
+_OLLAMA_SESSION.mount("http://", HTTPAdapter(
+    pool_connections=10, pool_maxsize=10,
+    max_retries=Retry(total=2, backoff_factor=0.2),
+))
+
+# Translates finished reply paragraphs while the model is still generating the rest
+_TRANSLATE_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="translate")
+TRANSLATE_BATCH_CHARS = 1500  # finished paragraphs are grouped up to this size per translate call
+TRANSLATE_MAX_CHARS = 4500    # Google Translate rejects requests over 5000 characters
+
+
+def _translate_long(text, lang):
+    """Translate text of any length; pieces keep their surrounding whitespace and line breaks."""
+    if len(text) <= TRANSLATE_MAX_CHARS:
+        return _translate_cached(text, lang)
+    out = []
+    for piece in split_for_translation(text, TRANSLATE_MAX_CHARS):
+        core = piece.strip()
+        if not core:
+            out.append(piece)
+            continue
+        start = len(piece) - len(piece.lstrip())
+        out.append(piece[:start] + _translate_cached(core, lang) + piece[start + len(core):])
+    return "".join(out)
+
+
+def _translate_paragraph(text, lang):
+    """Translate a block of reply text; blank or untranslatable blocks come back unchanged."""
+    if not text.strip():
+        return text
+    try:
+        return _translate_long(text, lang)
+    except Exception:
+        return text  # Keep original if translation fails
+
+
+class WorkerSignals(QObject):
+    chunk = pyqtSignal(str)          # streamed piece of the reply, as it arrives
+    finished = pyqtSignal(object)    # full reply, or list of replies for a batch (translated if needed)
+    failed = pyqtSignal(str)
+
+
+class OllamaRunnable(QRunnable):
+    """Streams one /api/chat reply on the global thread pool; results arrive through self.signals."""
+
+    def __init__(self, messages, options, target_lang):
+        super().__init__()
+        self.signals = WorkerSignals()
+        self.messages = messages
+        self.options = options
+        self.target_lang = target_lang
+
+    def run(self):
+        try:
+            parts = []
+            # Paragraphs are handed to the translate pool as soon as they are complete,
+            # so translation overlaps generation instead of starting after it
+            translate = HAS_TRANSLATOR and self.target_lang != "english"
+            pending = []
+            ready = []  # finished paragraphs not yet sent, grouped into one call per TRANSLATE_BATCH_CHARS
+            ready_chars = 0
+            tail = ""
+            unsent = []  # streamed pieces not yet emitted to the UI
+            last_emit = monotonic()
+            with _OLLAMA_SESSION.post(
+                OLLAMA_CHAT_URL,
+                data=chat_payload(self.messages, self.options),
+                headers=_JSON_HEADERS,
+                stream=True,
+                timeout=(OLLAMA_CONNECT_TIMEOUT, 120),
+            ) as resp:
+                resp.raise_for_status()
+                for line in resp.iter_lines():
+                    if not line:
+                        continue
+                    data = json_loads(line)
+                    try:
+                        piece = data["message"]["content"]  # /api/chat always streams message.content
+                    except (KeyError, TypeError):
+                        if "error" in data:
+                            raise RuntimeError(data["error"])
+                        piece = data.get("response", "")
+                    if piece:
+                        parts.append(piece)
+                        unsent.append(piece)
+                        # Coalesce tokens so the text area redraws a few times per frame budget, not per token
+                        if monotonic() - last_emit >= STREAM_EMIT_INTERVAL:
+                            self.signals.chunk.emit("".join(unsent))
+                            unsent = []
+                            last_emit = monotonic()
+                        if translate:
+                            tail += piece
+                            *done, tail = tail.split("\n\n")
+                            ready.extend(done)
+                            ready_chars += sum(map(len, done))
+                            if ready_chars >= TRANSLATE_BATCH_CHARS:
+                                pending.append(_TRANSLATE_POOL.submit(
+                                    _translate_paragraph, "\n\n".join(ready), self.target_lang))
+                                ready, ready_chars = [], 0
+                    if data.get("done"):
+                        break
+            if unsent:
+                self.signals.chunk.emit("".join(unsent))
+
+            if translate and parts:
+                ready.append(tail)
+                pending.append(_TRANSLATE_POOL.submit(_translate_paragraph, "\n\n".join(ready), self.target_lang))
+                assistant_reply = "\n\n".join(f.result() for f in pending)
+            else:
+                assistant_reply = "".join(parts)
+            self.signals.finished.emit(assistant_reply)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+
+
+DOCUMENT_NUM_PREDICT = 3000
+DOCUMENT_RULES_CHARS = 2000  # allowance for the instructions around the document text
+DOCUMENT_NUM_CTX_MAX = 32768
+DOCUMENT_BATCH_MAX = 3  # most questions answered by one batched request; num_ctx leaves room for their answers
+_model_context_length = None  # the model's trained context, read from /api/show at startup
+
+
+def _fetch_context_length():
+    resp = _OLLAMA_SESSION.post(
+        f"http://{OLLAMA_HOST}:{OLLAMA_PORT}/api/show",
+        json={"model": OLLAMA_MODEL},
+        timeout=(OLLAMA_CONNECT_TIMEOUT, 30),
+    )
+    resp.raise_for_status()
+    for key, value in (json_loads(resp.content).get("model_info") or {}).items():
+        if key.endswith(".context_length"):  # e.g. "llama.context_length"
+            return int(value)
+    return None
+
+
+def document_ctx_limit():
+    return min(DOCUMENT_NUM_CTX_MAX, _model_context_length or DOCUMENT_NUM_CTX_MAX)
+
+
+def document_max_chars():
+    """Longest document text that fits the context window next to the instructions and a full answer."""
+    return max(0, (document_ctx_limit() - DOCUMENT_NUM_PREDICT - 512) * 3 - DOCUMENT_RULES_CHARS)
+
+
+def document_num_ctx(prompt_chars, answers=DOCUMENT_BATCH_MAX):
+    """Context window that fits a document prompt of prompt_chars plus answers full answers,
+    rounded up to 2048 tokens (and capped at the model's limit).
+
+    Every document request must use the same value: a different num_ctx reloads the model
+    and throws away the cached prompt prefix.
+    """
+    needed = prompt_chars // 3 + answers * DOCUMENT_NUM_PREDICT + 512
+    return min(document_ctx_limit(), max(2048, -(-needed // 2048) * 2048))
+
+
+def document_batch_limit(num_ctx, prompt_chars):
+    """Most questions one request can answer without the answers pushing a prompt of prompt_chars out of num_ctx.
+
+    Between 1 and DOCUMENT_BATCH_MAX; long documents, whose num_ctx is capped, get 1.
+    """
+    room = num_ctx - prompt_chars // 3 - 512
+    return max(1, min(DOCUMENT_BATCH_MAX, room // DOCUMENT_NUM_PREDICT))
+
+
+def _warmup_ollama():
+    """Load OLLAMA_MODEL into memory in the background so the first question skips the cold load.
+
+    Also records the model's context length, which bounds how much document text is sent.
+    """
+    global _model_context_length
+    try:
+        _model_context_length = _fetch_context_length()
+        _OLLAMA_SESSION.post(
+            f"http://{OLLAMA_HOST}:{OLLAMA_PORT}/api/generate",
+            json={"model": OLLAMA_MODEL, "prompt": "", "keep_alive": OLLAMA_KEEP_ALIVE},  # empty prompt = load only
+            timeout=(OLLAMA_CONNECT_TIMEOUT, 300),
+        )
+    except Exception:
+        pass  # Ollama not running yet; the first real request reports it
+
+
+def warm_prompt_prefix(system, num_ctx):
+    """Prefill a system_message() once so later questions reuse Ollama's cached prefix; runs in a daemon thread."""
+    def _warm():
+        try:
+            _OLLAMA_SESSION.post(
+                OLLAMA_CHAT_URL,
+                data=chat_payload([system], {"num_ctx": num_ctx, "num_predict": 1}, stream=False),
+                headers=_JSON_HEADERS,
+                timeout=(OLLAMA_CONNECT_TIMEOUT, 300),
+            )
+        except Exception:
+            pass  # Best effort; the first question just pays the prefill instead
+    threading.Thread(target=_warm, daemon=True).start()
+
+
+TRANSLATE_DEBOUNCE_MS = 250      # quiet period before a language change is re-translated
+CLIPBOARD_DEBOUNCE_MS = 300      # quiet period before a clipboard change is translated (selections fire in bursts)
+CLIPBOARD_MAX_CHARS = 20000     # larger copies (logs, dumps) would fan out into many translate calls
+QUESTION_BATCH_WINDOW_MS = 100  # questions arriving within this window go out as one request
+
+
+def batch_ollama(prompts, system="", options=None):
+    """Answer several prompts with a single /api/chat call; returns one answer per prompt, in order.
+
+    system is a prompt string or an already encoded system_message().
+    """
+    numbered = "\n---\n".join(f"{i}. {p}" for i, p in enumerate(prompts, 1))
+    instruction = (
+        f"Answer each of the {len(prompts)} questions below, separated by '---'. "
+        f'Reply with a JSON object {{"answers": [...]}} holding exactly {len(prompts)} strings, '
+        f"one complete answer per question, in the same order.\n\n{numbered}"
+    )
+    messages = [{"role": "user", "content": instruction}]
+    if system:
+        messages.insert(0, system if isinstance(system, bytes) else {"role": "system", "content": system})
+    resp = _OLLAMA_SESSION.post(
+        OLLAMA_CHAT_URL,
+        data=chat_payload(messages, options or {}, stream=False, format="json"),
+        headers=_JSON_HEADERS,
+        timeout=(OLLAMA_CONNECT_TIMEOUT, 120 * len(prompts)),
+    )
+    resp.raise_for_status()
+    data = json_loads(resp.content)
+    try:
+        content = data["message"]["content"]
+    except (KeyError, TypeError):
+        raise ValueError(data.get("error") or "unexpected /api/chat response") from None
+    answers = json_loads(content)
+    if isinstance(answers, dict):
+        answers = answers.get("answers")
+    if not isinstance(answers, list) or len(answers) != len(prompts):
+        raise ValueError(f"expected {len(prompts)} answers, model returned an unexpected structure")
+    return [str(a) for a in answers]
+
+
+class OllamaBatchRunnable(QRunnable):
+    """Answers several questions with one batch_ollama call; emits the list of replies."""
+
+    def __init__(self, system, questions, options, target_lang):
+        super().__init__()
+        self.signals = WorkerSignals()
+        self.system = system
+        self.questions = questions
+        self.options = options
+        self.target_lang = target_lang
+
+    def run(self):
+        try:
+            replies = batch_ollama(self.questions, self.system, self.options)
+            if HAS_TRANSLATOR and self.target_lang != "english":
+                replies = list(_TRANSLATE_POOL.map(lambda r: _translate_paragraph(r, self.target_lang), replies))
+            self.signals.finished.emit(replies)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+
+
+# ----------------- Document retrieval -----------------
+OLLAMA_EMBED_URL = f"http://{OLLAMA_HOST}:{OLLAMA_PORT}/api/embed"
+OLLAMA_EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+RETRIEVAL_MIN_CHARS = 40000   # shorter documents are sent whole (and prefix-cached) instead
+RETRIEVAL_CHUNK_MIN = 300
+RETRIEVAL_CHUNK_MAX = 800
+RETRIEVAL_TOP_K = 5
+EMBED_BATCH = 256             # chunks per /api/embed call
+
+
+def _embed(texts):
+    """Embed texts through Ollama, returning unit-length vectors so cosine similarity is a dot product."""
+    vectors = []
+    for i in range(0, len(texts), EMBED_BATCH):
+        resp = _OLLAMA_SESSION.post(
+            OLLAMA_EMBED_URL,
+            json={"model": OLLAMA_EMBED_MODEL, "input": texts[i:i + EMBED_BATCH], "keep_alive": OLLAMA_KEEP_ALIVE},
+            timeout=(OLLAMA_CONNECT_TIMEOUT, 120),
+        )
+        resp.raise_for_status()
+        vectors.extend(json_loads(resp.content)["embeddings"])
+    if HAS_NUMPY:
+        import numpy as np
+        matrix = np.asarray(vectors, dtype=np.float32)
+        return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    unit = []
+    for v in vectors:
+        norm = sum(x * x for x in v) ** 0.5 or 1.0
+        unit.append([x / norm for x in v])
+    return unit
+
+
+class DocumentIndex:
+    """Paragraph chunks of a document with their embeddings, for top-k retrieval per question."""
+
+    def __init__(self, chunks, vectors):
+        self.chunks = chunks
+        self.vectors = vectors
+
+    @classmethod
+    def build(cls, text):
+        chunks = chunk_paragraphs(text, RETRIEVAL_CHUNK_MIN, RETRIEVAL_CHUNK_MAX)
+        return cls(chunks, _embed(chunks))
+
+    def top_k(self, question, k=RETRIEVAL_TOP_K):
+        """The k chunks most similar to question, joined in document order."""
+        q = _embed([question])[0]
+        if HAS_NUMPY:
+            scores = self.vectors @ q
+        else:
+            scores = [sum(a * b for a, b in zip(v, q)) for v in self.vectors]
+        return "\n\n[...]\n\n".join(self.chunks[i] for i in top_k_indices(scores, k))
+
+
+class DocumentIndexThread(QThread):
+    ready = pyqtSignal(object)  # DocumentIndex, or None if embedding failed
+
+    def __init__(self, text, parent=None):
+        super().__init__(parent)
+        self.text = text
+
+    def run(self):
+        try:
+            self.ready.emit(DocumentIndex.build(self.text))
+        except Exception:
+            self.ready.emit(None)  # Fall back to sending the whole document
+
+
+class RetrievalRunnable(OllamaRunnable):
+    """OllamaRunnable that first builds its messages from the excerpts most relevant to the question."""
+
+    def __init__(self, index, question, build_messages, options, target_lang):
+        super().__init__(None, options, target_lang)
+        self.index = index
+        self.question = question
+        self.build_messages = build_messages
+
+    def run(self):
+        try:
+            self.messages = self.build_messages(self.index.top_k(self.question))
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        super().run()
+
+
+# ----------------- S3 client -----------------
+@lru_cache(maxsize=1)
+def _s3_client():
+    """One shared S3 client: credentials, endpoints and TLS pool are set up once (clients are thread-safe)."""
+    import boto3
+    from botocore.config import Config as BotoConfig
+    return boto3.client(
+        "s3",
+        aws_access_key_id=AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
+        region_name=AWS_REGION,
+        # wide pool so multipart transfer threads don't wait for connections
+        config=BotoConfig(max_pool_connections=32, retries={'max_attempts': 3, 'mode': 'adaptive'})
+    )
+
+
+def _sha256(path):
+    """Hex SHA-256 of a file, stored as S3 object metadata to tell same-name uploads apart."""
+    with open(path, "rb") as f:
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+: hashes in C without per-chunk Python calls
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        h = hashlib.sha256()
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+        return h.hexdigest()
+
+
+# ----------------- S3 Upload Worker -----------------
+class UploadSignals(QObject):
     progress = pyqtSignal(str)
     extracted_text_signal = pyqtSignal(str, str)  # (extracted_text, s3_key)
 
+
+class UploadRunnable(QRunnable):
+    """Uploads a PDF and extracts its text; runs on the window's single-thread upload pool."""
+
     def __init__(self, file_path):
         super().__init__()
+        self.signals = UploadSignals()
         self.file_path = str(file_path)
-        self.s3 = boto3.client(
-            "s3",
-            aws_access_key_id=AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-            region_name=AWS_REGION
-        )
+        self.s3 = None                # created in run(), so boto3 loads off the GUI thread
+        self._transfer_config = None
+        self._file_size = os.path.getsize(self.file_path) or 1
+        self._uploaded_bytes = 0
+        self._last_percent = -1
+        self._progress_lock = threading.Lock()
+
+    def _on_upload_bytes(self, n):
+        """boto3 transfer callback (runs on transfer threads); reports each new 10% step."""
+        with self._progress_lock:
+            self._uploaded_bytes += n
+            percent = min(100, self._uploaded_bytes * 100 // self._file_size) // 10 * 10
+            if percent == self._last_percent:
+                return
+            self._last_percent = percent
+        self.signals.progress.emit(f"⏳ Uploading {os.path.basename(self.file_path)}... {percent}%")
+
+    def _extract_with_processes(self, num_pages):
+        """Extract a large PDF across CPU cores, EXTRACT_CHUNK_PAGES pages per task."""
+        ranges = [(start, min(start + EXTRACT_CHUNK_PAGES, num_pages))
+                  for start in range(0, num_pages, EXTRACT_CHUNK_PAGES)]
+        workers = min(os.cpu_count() or 1, len(ranges))
+        # spawn, not fork: forking a process that runs Qt and boto3 threads can deadlock
+        ctx = multiprocessing.get_context("spawn")
+        parts = []
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            futures = [pool.submit(_extract_range, self.file_path, start, end) for start, end in ranges]
+            for (start, end), future in zip(ranges, futures):
+                parts.append(future.result())
+                self.signals.progress.emit(f"⏳ Extracted {end}/{num_pages} pages...")
+        return "".join(parts)
+
+    def _extract_with_pypdf2(self):
+        reader = _pdf_reader(self.file_path)
+        num_pages = len(reader.pages)
+        if num_pages < PARALLEL_EXTRACT_MIN_PAGES:
+            parts = []
+            for p in reader.pages:
+                # page.extract_text() may return None
+                parts.append(p.extract_text() or "")
+                parts.append("\n\n")
+            return "".join(parts)
+        elif num_pages < PROCESS_EXTRACT_MIN_PAGES:
+            pages = [""] * num_pages
+            workers = min(os.cpu_count() or 1, 8)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = pool.map(partial(_extract_page, path=self.file_path), range(num_pages))
+                for done, (i, page_text) in enumerate(results, 1):
+                    pages[i] = page_text
+                    if done % EXTRACT_PROGRESS_EVERY == 0:
+                        self.signals.progress.emit(f"⏳ Extracted {done}/{num_pages} pages...")
+            return "".join(page_text + "\n\n" for page_text in pages)
+        return self._extract_with_processes(num_pages)
+
+    def _extract_with_pdfium(self):
+        num_pages = _pdfium_page_count(self.file_path)
+        if num_pages < PDFIUM_PROCESS_MIN_PAGES:
+            return _pdfium_range(self.file_path, 0, num_pages)
+        return self._extract_with_processes(num_pages)
+
+    def _stored_extract(self, key):
+        """Text previously extracted to AWS_EXTRACT_BUCKET under key, or None if it isn't there."""
+        try:
+            # Ranged, parallel GETs for large extracts (single GET below the multipart threshold)
+            buf = BytesIO()
+            self.s3.download_fileobj(AWS_EXTRACT_BUCKET, key, buf, Config=self._transfer_config)
+            return buf.getvalue().decode("utf-8")
+        except Exception:
+            # Missing (or unreadable): extract from the PDF as usual
+            return None
 
     def run(self):
         try:
+            from boto3.s3.transfer import TransferConfig
+            self.s3 = _s3_client()
+            # Multipart, multi-threaded transfers for large files
+            self._transfer_config = TransferConfig(
+                multipart_threshold=8 * 1024 * 1024,
+                multipart_chunksize=8 * 1024 * 1024,
+                max_concurrency=10,
+                use_threads=True
+            )
             filename = os.path.basename(self.file_path)
-            # Check duplicate: list objects keys in bucket
+            digest = _sha256(self.file_path)
+            # Check duplicate: a single HEAD on the exact key, then compare content hashes
             already = False
             try:
-                resp = self.s3.list_objects_v2(Bucket=AWS_BUCKET_NAME, Prefix=filename)
-                if 'Contents' in resp:
-                    for obj in resp['Contents']:
-                        if obj['Key'] == filename:
-                            already = True
-                            break
+                head = self.s3.head_object(Bucket=AWS_BUCKET_NAME, Key=filename)
+                stored = head.get("Metadata", {}).get("sha256")
+                # objects uploaded before hashes were recorded are unknown: re-upload them with one
+                already = stored is not None and stored == digest
             except Exception:
+                # 404 (not there yet) or e.g. 403 without s3:ListBucket:
                 # silent fallback; still attempt upload
                 pass
 
             if already:
-                self.progress.emit(f"⚠️ File '{filename}' already exists in {AWS_BUCKET_NAME}. Skipping upload.")
+                self.signals.progress.emit(
+                    f"⚠️ File '{filename}' already exists in {AWS_BUCKET_NAME}. Skipping upload.")
             else:
-                self.s3.upload_file(self.file_path, AWS_BUCKET_NAME, filename)
-                self.progress.emit(f"✅ Uploaded '{filename}' → s3://{AWS_BUCKET_NAME}/{filename}")
+                self.s3.upload_file(
+                    self.file_path, AWS_BUCKET_NAME, filename,
+                    ExtraArgs={"Metadata": {"sha256": digest}},
+                    Config=self._transfer_config, Callback=self._on_upload_bytes
+                )
+                self.signals.progress.emit(f"✅ Uploaded '{filename}' → s3://{AWS_BUCKET_NAME}/{filename}")
+
+            # Same file seen before: reuse its stored extract instead of parsing every page again
+            if already and AWS_EXTRACT_BUCKET:
+                key = f"{Path(filename).stem}.txt"
+                text = self._stored_extract(key)
+                if text is not None:
+                    self.signals.progress.emit(f"✅ Reusing extracted text from s3://{AWS_EXTRACT_BUCKET}/{key}")
+                    self.signals.extracted_text_signal.emit(text, key)
+                    return
 
             # Extract text from PDF
             text = ""
             try:
-                reader = PdfReader(self.file_path)
-                for p in reader.pages:
-                    # page.extract_text() may return None
-                    page_text = p.extract_text() or ""
-                    text += page_text + "\n\n"
+                text = self._extract_with_pdfium() if HAS_PDFIUM else self._extract_with_pypdf2()
             except Exception as e:
-                self.progress.emit(f"⚠️ PDF extraction failed: {e}")
+                self.signals.progress.emit(f"⚠️ PDF extraction failed: {e}")
                 text = ""
 
             # Store extracted .txt in extract bucket
             if text and AWS_EXTRACT_BUCKET:
                 key = f"{Path(filename).stem}.txt"
                 try:
-                    self.s3.put_object(Bucket=AWS_EXTRACT_BUCKET, Key=key, Body=text.encode("utf-8"))
-                    self.progress.emit(f"✅ Extracted text stored → s3://{AWS_EXTRACT_BUCKET}/{key}")
-                    self.extracted_text_signal.emit(text, key)
+                    # Encode in slices into a spooled file instead of one full-size bytes copy
+                    with SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES, mode="w+b") as buf:
+                        for i in range(0, len(text), ENCODE_SLICE_CHARS):
+                            buf.write(text[i:i + ENCODE_SLICE_CHARS].encode("utf-8"))
+                        buf.seek(0)
+                        self.s3.upload_fileobj(buf, AWS_EXTRACT_BUCKET, key, Config=self._transfer_config)
+                    self.signals.progress.emit(f"✅ Extracted text stored → s3://{AWS_EXTRACT_BUCKET}/{key}")
+                    self.signals.extracted_text_signal.emit(text, key)
                 except Exception as e:
-                    self.progress.emit(f"⚠️ Failed to store extracted text: {e}")
-                    self.extracted_text_signal.emit(text, "")  # still provide extracted text
+                    self.signals.progress.emit(f"⚠️ Failed to store extracted text: {e}")
+                    self.signals.extracted_text_signal.emit(text, "")  # still provide extracted text
             else:
                 # send text back even if not stored
-                self.extracted_text_signal.emit(text, "")
+                self.signals.extracted_text_signal.emit(text, "")
 
         except Exception as e:
             tb = traceback.format_exc()
-            self.progress.emit(f"⚠️ UploadThread error: {e}\n{tb}")
+            self.signals.progress.emit(f"⚠️ Upload error: {e}\n{tb}")
 
 # ----------------- Floating AI Button -----------------
 class FloatingAIButton(QWidget):
@@ -192,30 +1147,42 @@ class FloatingAIButton(QWidget):
         start_x = max(50, screen_geo.width() - 150)
         start_y = max(50, screen_geo.height() - 200)
         self.move(start_x, start_y)
+        self._build_pixmaps()
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
+    def _build_pixmaps(self):
+        """Render the button once per mode; paintEvent only blits the cached pixmap."""
+        ratio = self.devicePixelRatioF()
+        self._pixmap_ratio = ratio
+        self._cached_pixmaps = {}
+        for mode, start_color in (("translate", QColor(106, 17, 203)),   # purple
+                                  ("document", QColor(76, 175, 80))):    # green
+            pix = QPixmap(int(self.diameter * ratio), int(self.diameter * ratio))
+            pix.setDevicePixelRatio(ratio)
+            pix.fill(Qt.transparent)
 
-        # Gradient fill based on mode
-        grad = QLinearGradient(0, 0, self.width(), self.height())
-        if self.current_mode == "translate":
-            grad.setColorAt(0.0, QColor(106, 17, 203))  # purple
-            grad.setColorAt(1.0, QColor(33, 150, 243))  # blue
-        else:
-            grad.setColorAt(0.0, QColor(76, 175, 80))   # green
+            painter = QPainter(pix)
+            painter.setRenderHint(QPainter.Antialiasing)
+
+            # Gradient fill based on mode
+            grad = QLinearGradient(0, 0, self.diameter, self.diameter)
+            grad.setColorAt(0.0, start_color)
             grad.setColorAt(1.0, QColor(33, 150, 243))  # blue
-        
-        brush = QBrush(grad)
-        painter.setBrush(brush)
-        painter.setPen(Qt.NoPen)
-        painter.drawEllipse(0, 0, self.diameter, self.diameter)
+            painter.setBrush(QBrush(grad))
+            painter.setPen(Qt.NoPen)
+            painter.drawEllipse(0, 0, self.diameter, self.diameter)
 
-        # Icon text
-        painter.setPen(QPen(QColor(255,255,255)))
-        font = QFont("Arial", int(self.diameter/4), QFont.Bold)
-        painter.setFont(font)
-        painter.drawText(self.rect(), Qt.AlignCenter, self.icon_text)
+            # Icon text
+            painter.setPen(QPen(QColor(255,255,255)))
+            painter.setFont(QFont("Arial", int(self.diameter/4), QFont.Bold))
+            painter.drawText(QRect(0, 0, self.diameter, self.diameter), Qt.AlignCenter, self.icon_text)
+            painter.end()
+            self._cached_pixmaps[mode] = pix
+
+    def paintEvent(self, event):
+        if self.devicePixelRatioF() != self._pixmap_ratio:
+            self._build_pixmaps()  # moved to a screen with a different scale factor
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._cached_pixmaps[self.current_mode])
 
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
@@ -242,22 +1209,7 @@ class FloatingAIButton(QWidget):
 
     def show_context_menu(self, pos):
         menu = QMenu()
-        menu.setStyleSheet("""
-            QMenu {
-                background-color: #1e1e2e;
-                color: white;
-                border: 2px solid #6a11cb;
-                border-radius: 8px;
-                padding: 5px;
-            }
-            QMenu::item {
-                padding: 8px 20px;
-                border-radius: 4px;
-            }
-            QMenu::item:selected {
-                background-color: #6a11cb;
-            }
-        """)
+        menu.setStyleSheet(_STYLE_MENU_CONTEXT)
 
         translate_action = menu.addAction("🌐 Translate Mode")
         document_action = menu.addAction("📄 Document Mode")
@@ -287,8 +1239,37 @@ class AIAssistantWindow(QWidget):
         self.current_mode = "translate"
         self.last_clip = ""
         self.pdf_extracted_text = ""
+        self._doc_key = b""       # digest of the loaded text; identifies the document in answer-cache keys
+        self._doc_prompt = None   # (target language, encoded full-document system message) for the latest language
         self.current_pdf_key = None
         
+        # Document questions asked close together (or while a reply is running) are sent as one batch
+        self._pending_questions = []
+        self._document_busy = False
+        self._doc_num_ctx = 2048
+        self._doc_index = None  # paragraph index for long documents, built after upload
+        self.index_worker = None
+        
+        # Uploads run one at a time on their own pool; a second request is refused, not queued
+        self.uploader = None
+        self._upload_pool = QThreadPool(self)
+        self._upload_pool.setMaxThreadCount(1)
+        
+        # Language scrolling and clipboard bursts re-translate once, after things settle
+        self._translate_debounce = QTimer(self)
+        self._translate_debounce.setSingleShot(True)
+        self._translate_debounce.timeout.connect(self._do_translate)
+        self._translate_signals = TranslateSignals(self)
+        # While an Ollama reply streams into the translate area, clipboard output waits for it to end
+        self._translate_streaming = False
+        self._held_translate_text = None
+        self._translate_signals.done.connect(self._translate_done)
+        self._translate_signals.failed.connect(self._translate_failed)
+        self._question_timer = QTimer(self)
+        self._question_timer.setSingleShot(True)
+        self._question_timer.setInterval(QUESTION_BATCH_WINDOW_MS)
+        self._question_timer.timeout.connect(self._flush_questions)
+        
         # Window properties for customization
         self.min_width = 400
         self.min_height = 400
@@ -299,9 +1280,9 @@ class AIAssistantWindow(QWidget):
         
         self.init_ui()
         
-        # Clipboard timer for translate mode
-        self.clipboard_timer = QTimer()
-        self.clipboard_timer.timeout.connect(self.check_clipboard)
+        # Clipboard change notifications for translate mode (no polling)
+        self._qclip = QApplication.clipboard()
+        self._clip_connected = False
         
         self.position_window()
 
@@ -333,23 +1314,7 @@ class AIAssistantWindow(QWidget):
         self.document_btn.clicked.connect(lambda: self.switch_mode("document"))
         
         for btn in [self.translate_btn, self.document_btn]:
-            btn.setStyleSheet("""
-                QPushButton {
-                    background:#1e2030;
-                    color:white;
-                    border:2px solid #2e3040;
-                    border-radius:8px;
-                    padding:10px 20px;
-                    font-weight:600;
-                }
-                QPushButton:checked {
-                    background:#6a11cb;
-                    border-color:#6a11cb;
-                }
-                QPushButton:hover {
-                    background:#2e3550;
-                }
-            """)
+            btn.setStyleSheet(_STYLE_MODE_BTN)
         
         mode_layout.addWidget(self.translate_btn)
         mode_layout.addWidget(self.document_btn)
@@ -398,22 +1363,11 @@ class AIAssistantWindow(QWidget):
         
         for btn in [self.settings_btn, self.minimize_btn, self.clear_btn, self.close_btn]:
             btn.setFixedSize(32, 32)
-            btn.setStyleSheet("""
-                QPushButton {
-                    background:#2e3040;
-                    color:white;
-                    border:none;
-                    border-radius:6px;
-                    font-weight:bold;
-                }
-                QPushButton:hover {
-                    background:#ff5252;
-                }
-            """)
-        
-        self.settings_btn.setStyleSheet(self.settings_btn.styleSheet().replace("#ff5252", "#9c27b0"))
-        self.minimize_btn.setStyleSheet(self.minimize_btn.styleSheet().replace("#ff5252", "#ffa726"))
-        self.clear_btn.setStyleSheet(self.clear_btn.styleSheet().replace("#ff5252", "#42a5f5"))
+            btn.setStyleSheet(_STYLE_HEADER_BTN)
+        
+        self.settings_btn.setStyleSheet(_STYLE_HEADER_BTN_SETTINGS)
+        self.minimize_btn.setStyleSheet(_STYLE_HEADER_BTN_MINIMIZE)
+        self.clear_btn.setStyleSheet(_STYLE_HEADER_BTN_CLEAR)
         
         self.settings_btn.clicked.connect(self.show_settings_menu)
         self.minimize_btn.clicked.connect(self.showMinimized)
@@ -434,97 +1388,87 @@ class AIAssistantWindow(QWidget):
         
         return header
 
-    def show_settings_menu(self):
+    def _build_settings_menu(self):
+        """Build the settings menu once; show_settings_menu reuses it."""
         menu = QMenu(self)
-        menu.setStyleSheet("""
-            QMenu {
-                background-color: #1e1e2e;
-                color: white;
-                border: 2px solid #9c27b0;
-                border-radius: 8px;
-                padding: 8px;
-            }
-            QMenu::item {
-                padding: 10px 30px;
-                border-radius: 4px;
-            }
-            QMenu::item:selected {
-                background-color: #9c27b0;
-            }
-            QMenu::separator {
-                height: 1px;
-                background: #444;
-                margin: 5px 10px;
-            }
-        """)
+        menu.setStyleSheet(_STYLE_MENU_SETTINGS)
+        actions = {}
         
         # Size options
         size_menu = menu.addMenu("📏 Window Size")
-        small_action = size_menu.addAction("Small (500x500)")
-        medium_action = size_menu.addAction("Medium (600x650)")
-        large_action = size_menu.addAction("Large (800x800)")
-        xlarge_action = size_menu.addAction("X-Large (1000x900)")
+        actions["small"] = size_menu.addAction("Small (500x500)")
+        actions["medium"] = size_menu.addAction("Medium (600x650)")
+        actions["large"] = size_menu.addAction("Large (800x800)")
+        actions["xlarge"] = size_menu.addAction("X-Large (1000x900)")
         
         menu.addSeparator()
         
         # Opacity options
         opacity_menu = menu.addMenu("💡 Window Opacity")
-        opacity_100 = opacity_menu.addAction("100% (Solid)")
-        opacity_90 = opacity_menu.addAction("90%")
-        opacity_80 = opacity_menu.addAction("80%")
-        opacity_70 = opacity_menu.addAction("70%")
-        opacity_60 = opacity_menu.addAction("60% (Transparent)")
+        actions["opacity_100"] = opacity_menu.addAction("100% (Solid)")
+        actions["opacity_90"] = opacity_menu.addAction("90%")
+        actions["opacity_80"] = opacity_menu.addAction("80%")
+        actions["opacity_70"] = opacity_menu.addAction("70%")
+        actions["opacity_60"] = opacity_menu.addAction("60% (Transparent)")
         
         menu.addSeparator()
         
         # Position options
         position_menu = menu.addMenu("📍 Window Position")
-        top_left = position_menu.addAction("Top Left")
-        top_right = position_menu.addAction("Top Right")
-        bottom_left = position_menu.addAction("Bottom Left")
-        bottom_right = position_menu.addAction("Bottom Right")
-        center = position_menu.addAction("Center")
+        actions["top_left"] = position_menu.addAction("Top Left")
+        actions["top_right"] = position_menu.addAction("Top Right")
+        actions["bottom_left"] = position_menu.addAction("Bottom Left")
+        actions["bottom_right"] = position_menu.addAction("Bottom Right")
+        actions["center"] = position_menu.addAction("Center")
         
         menu.addSeparator()
         
         # Stay on top toggle
-        stay_on_top_action = menu.addAction("📌 Always on Top")
-        stay_on_top_action.setCheckable(True)
-        stay_on_top_action.setChecked(self.windowFlags() & Qt.WindowStaysOnTopHint)
+        actions["stay_on_top"] = menu.addAction("📌 Always on Top")
+        actions["stay_on_top"].setCheckable(True)
         
-        action = menu.exec_(self.settings_btn.mapToGlobal(self.settings_btn.rect().bottomLeft()))
+        self._settings_menu = menu
+        self._settings_actions = actions
+
+    def show_settings_menu(self):
+        if getattr(self, "_settings_menu", None) is None:
+            self._build_settings_menu()
+        a = self._settings_actions
+        stay_on_top_action = a["stay_on_top"]
+        stay_on_top_action.setChecked(bool(self.windowFlags() & Qt.WindowStaysOnTopHint))
         
-        if action == small_action:
+        action = self._settings_menu.exec_(self.settings_btn.mapToGlobal(self.settings_btn.rect().bottomLeft()))
+        
+        if action == a["small"]:
             self.resize(500, 500)
-        elif action == medium_action:
+        elif action == a["medium"]:
             self.resize(600, 650)
-        elif action == large_action:
+        elif action == a["large"]:
             self.resize(800, 800)
-        elif action == xlarge_action:
+        elif action == a["xlarge"]:
             self.resize(1000, 900)
-        elif action == opacity_100:
+        elif action == a["opacity_100"]:
             self.setWindowOpacity(1.0)
-        elif action == opacity_90:
+        elif action == a["opacity_90"]:
             self.setWindowOpacity(0.9)
-        elif action == opacity_80:
+        elif action == a["opacity_80"]:
             self.setWindowOpacity(0.8)
-        elif action == opacity_70:
+        elif action == a["opacity_70"]:
             self.setWindowOpacity(0.7)
-        elif action == opacity_60:
+        elif action == a["opacity_60"]:
             self.setWindowOpacity(0.6)
-        elif action == top_left:
-            screen_geo = QApplication.primaryScreen().availableGeometry()
+        elif action == a["top_left"]:
             self.move(20, 20)
-        elif action == top_right:
+        elif action == a["top_right"]:
             screen_geo = QApplication.primaryScreen().availableGeometry()
             self.move(screen_geo.width() - self.width() - 20, 20)
-        elif action == bottom_left:
+        elif action == a["bottom_left"]:
             screen_geo = QApplication.primaryScreen().availableGeometry()
             self.move(20, screen_geo.height() - self.height() - 20)
-        elif action == bottom_right:
+        elif action == a["bottom_right"]:
             screen_geo = QApplication.primaryScreen().availableGeometry()
             self.move(screen_geo.width() - self.width() - 20, screen_geo.height() - self.height() - 20)
-        elif action == center:
+        elif action == a["center"]:
             screen_geo = QApplication.primaryScreen().availableGeometry()
             self.move((screen_geo.width() - self.width()) // 2, (screen_geo.height() - self.height()) // 2)
         elif action == stay_on_top_action:
@@ -545,27 +1489,7 @@ class AIAssistantWindow(QWidget):
         self.lang_box = QComboBox()
         self.lang_box.addItems(["english", "hindi", "spanish", "french", "german", "chinese", "arabic", "japanese", "russian", "portuguese", "italian", "korean", "turkish", "dutch", "polish"])
         self.lang_box.setCurrentText("english")
-        self.lang_box.setStyleSheet("""
-            QComboBox {
-                background:#1e2030;
-                color:white;
-                padding:10px;
-                border:2px solid #2e3040;
-                border-radius:8px;
-                font-size:13px;
-            }
-            QComboBox:hover {
-                border-color:#6a11cb;
-            }
-            QComboBox::drop-down {
-                border:none;
-            }
-            QComboBox QAbstractItemView {
-                background:#1e2030;
-                color:white;
-                selection-background-color:#6a11cb;
-            }
-        """)
+        self.lang_box.setStyleSheet(_STYLE_COMBO_TRANSLATE)
         # Connect language change to re-translate current text
         self.lang_box.currentTextChanged.connect(self.on_language_changed)
         
@@ -578,17 +1502,7 @@ class AIAssistantWindow(QWidget):
         
         self.translate_text_area = QTextEdit()
         self.translate_text_area.setReadOnly(True)
-        self.translate_text_area.setStyleSheet("""
-            QTextEdit {
-                background:#12141f;
-                color:#ffffff;
-                border:2px solid #2e3040;
-                border-radius:8px;
-                padding:15px;
-                font-size:14px;
-                line-height:1.6;
-            }
-        """)
+        self.translate_text_area.setStyleSheet(_STYLE_TEXT_TRANSLATE)
         self.translate_text_area.setPlaceholderText("📋 Copy any text from anywhere...\n\n✨ It will automatically appear here and translate to your selected language!")
         
         layout.addWidget(display_label)
@@ -596,40 +1510,14 @@ class AIAssistantWindow(QWidget):
         
         # Question input for Ollama
         qa_label = QLabel("💬 Ask about copied text:")
-        qa_label.setStyleSheet("color:#aaaaaa; font-size:12px; margin-top:10px;")
+        qa_label.setStyleSheet(_STYLE_FIELD_LABEL)
         
         self.translate_input = QLineEdit()
         self.translate_input.setPlaceholderText("Type your question here...")
-        self.translate_input.setStyleSheet("""
-            QLineEdit {
-                background:#1e2030;
-                color:white;
-                padding:10px;
-                border:2px solid #2e3040;
-                border-radius:8px;
-            }
-            QLineEdit:focus {
-                border-color:#6a11cb;
-            }
-        """)
+        self.translate_input.setStyleSheet(_STYLE_INPUT_TRANSLATE)
         
         self.translate_send_btn = QPushButton("Send Question")
-        self.translate_send_btn.setStyleSheet("""
-            QPushButton {
-                background:#6a11cb;
-                color:white;
-                border:none;
-                padding:10px 20px;
-                border-radius:8px;
-                font-weight:600;
-            }
-            QPushButton:hover {
-                background:#8a31eb;
-            }
-            QPushButton:pressed {
-                background:#5a01bb;
-            }
-        """)
+        self.translate_send_btn.setStyleSheet(_STYLE_BTN_TRANSLATE_SEND)
         self.translate_send_btn.clicked.connect(self.ask_translate_ollama)
         
         qa_row = QHBoxLayout()
@@ -651,22 +1539,7 @@ class AIAssistantWindow(QWidget):
         doc_upload_label.setStyleSheet("color:#aaaaaa; font-size:12px;")
         
         self.upload_btn = QPushButton("Choose PDF File")
-        self.upload_btn.setStyleSheet("""
-            QPushButton {
-                background:#1976d2;
-                color:white;
-                border:none;
-                padding:12px 20px;
-                border-radius:8px;
-                font-weight:600;
-            }
-            QPushButton:hover {
-                background:#1e88e5;
-            }
-            QPushButton:pressed {
-                background:#1565c0;
-            }
-        """)
+        self.upload_btn.setStyleSheet(_STYLE_BTN_UPLOAD)
         self.upload_btn.clicked.connect(self.select_file)
         
         self.upload_status = QLabel("No document uploaded yet")
@@ -678,45 +1551,22 @@ class AIAssistantWindow(QWidget):
         
         # Language selector for document responses
         doc_lang_label = QLabel("🌐 Response Language:")
-        doc_lang_label.setStyleSheet("color:#aaaaaa; font-size:12px; margin-top:10px;")
+        doc_lang_label.setStyleSheet(_STYLE_FIELD_LABEL)
         
         self.doc_lang_box = QComboBox()
         self.doc_lang_box.addItems(["english", "hindi", "spanish", "french", "german", "chinese", "arabic", "japanese", "russian", "portuguese"])
-        self.doc_lang_box.setStyleSheet("""
-            QComboBox {
-                background:#1e2030;
-                color:white;
-                padding:8px;
-                border:2px solid #2e3040;
-                border-radius:8px;
-            }
-            QComboBox:hover {
-                border-color:#4caf50;
-            }
-            QComboBox::drop-down {
-                border:none;
-            }
-        """)
+        self.doc_lang_box.setStyleSheet(_STYLE_COMBO_DOCUMENT)
         
         layout.addWidget(doc_lang_label)
         layout.addWidget(self.doc_lang_box)
         
         # Document display area
         doc_label = QLabel("📄 Document Q&A:")
-        doc_label.setStyleSheet("color:#aaaaaa; font-size:12px; margin-top:10px;")
+        doc_label.setStyleSheet(_STYLE_FIELD_LABEL)
         
         self.document_text_area = QTextEdit()
         self.document_text_area.setReadOnly(True)
-        self.document_text_area.setStyleSheet("""
-            QTextEdit {
-                background:#12141f;
-                color:white;
-                border:2px solid #2e3040;
-                border-radius:8px;
-                padding:10px;
-                font-size:13px;
-            }
-        """)
+        self.document_text_area.setStyleSheet(_STYLE_TEXT_DOCUMENT)
         self.document_text_area.setPlaceholderText("Upload a PDF and ask questions about it...")
         
         layout.addWidget(doc_label)
@@ -724,46 +1574,16 @@ class AIAssistantWindow(QWidget):
         
         # Question input for document
         qa_label = QLabel("❓ Ask about document:")
-        qa_label.setStyleSheet("color:#aaaaaa; font-size:12px; margin-top:10px;")
+        qa_label.setStyleSheet(_STYLE_FIELD_LABEL)
         
         self.document_input = QLineEdit()
         self.document_input.setPlaceholderText("What would you like to know?")
-        self.document_input.setStyleSheet("""
-            QLineEdit {
-                background:#1e2030;
-                color:white;
-                padding:10px;
-                border:2px solid #2e3040;
-                border-radius:8px;
-            }
-            QLineEdit:focus {
-                border-color:#4caf50;
-            }
-        """)
+        self.document_input.setStyleSheet(_STYLE_INPUT_DOCUMENT)
         self.document_input.returnPressed.connect(self.ask_document_ollama)
         
         self.document_send_btn = QPushButton("Ask Question")
         self.document_send_btn.setEnabled(False)
-        self.document_send_btn.setStyleSheet("""
-            QPushButton {
-                background:#4caf50;
-                color:white;
-                border:none;
-                padding:10px 20px;
-                border-radius:8px;
-                font-weight:600;
-            }
-            QPushButton:hover:enabled {
-                background:#66bb6a;
-            }
-            QPushButton:pressed:enabled {
-                background:#388e3c;
-            }
-            QPushButton:disabled {
-                background:#2e3040;
-                color:#666666;
-            }
-        """)
+        self.document_send_btn.setStyleSheet(_STYLE_BTN_DOCUMENT_SEND)
         self.document_send_btn.clicked.connect(self.ask_document_ollama)
         
         qa_row = QHBoxLayout()
@@ -797,14 +1617,20 @@ class AIAssistantWindow(QWidget):
             self.document_btn.setChecked(False)
             self.translate_widgets.show()
             self.document_widgets.hide()
-            # Start clipboard monitoring with faster interval
-            self.clipboard_timer.start(300)  # Check every 300ms for faster response
+            # Start clipboard monitoring: Qt signals each change, no polling
+            if not self._clip_connected:
+                self._qclip.dataChanged.connect(self.check_clipboard)
+                self._clip_connected = True
+            # Pick up whatever was copied while monitoring was off
+            self.check_clipboard()
         else:
             self.translate_btn.setChecked(False)
             self.document_btn.setChecked(True)
             self.translate_widgets.hide()
             self.document_widgets.show()
-            self.clipboard_timer.stop()
+            if self._clip_connected:
+                self._qclip.dataChanged.disconnect(self.check_clipboard)
+                self._clip_connected = False
 
     def clear_content(self):
         if self.current_mode == "translate":
@@ -816,29 +1642,38 @@ class AIAssistantWindow(QWidget):
 
     def check_clipboard(self):
         """Auto-detect and translate copied text"""
-        if not HAS_PYPERCLIP:
-            return
-        
-        try:
-            text = pyperclip.paste().strip()
-        except Exception:
+        text = self._qclip.text()
+        
+        # Huge copies aren't auto-translated; bail out before stripping/comparing them
+        if len(text) > CLIPBOARD_MAX_CHARS:
+            # Forget the previous clip too, so a language change doesn't re-translate it over this notice
+            self.last_clip = ""
+            self._translate_debounce.stop()
+            self._show_translate_text(
+                f"⚠️ Copied text is too long to auto-translate "
+                f"({len(text):,} characters, limit {CLIPBOARD_MAX_CHARS:,})."
+            )
             return
+        text = text.strip()
         
-        # Only process if text is new
+        # Only process if text is new (str == checks length first, so most changes exit in O(1))
         if not text or text == self.last_clip:
             return
         
         # Store the new clipboard text
         self.last_clip = text
         
-        # Translate immediately with a small delay to prevent UI blocking
-        QTimer.singleShot(50, lambda: self.translate_and_display(text))
+        # Translate once the clipboard has been quiet for the debounce interval
+        self._translate_debounce.start(CLIPBOARD_DEBOUNCE_MS)
 
     def on_language_changed(self):
         """Re-translate when language is changed"""
         if self.last_clip:
-            # Re-translate the last copied text with new language
-            self.translate_and_display(self.last_clip)
+            # Re-translate the last copied text once the selection settles
+            self._translate_debounce.start(TRANSLATE_DEBOUNCE_MS)
+
+    def _do_translate(self):
+        self.translate_and_display(self.last_clip)
 
     def translate_and_display(self, text):
         """Translate text to selected language and display"""
@@ -848,48 +1683,71 @@ class AIAssistantWindow(QWidget):
         target = self.lang_box.currentText()
         
         if not HAS_TRANSLATOR:
-            self.translate_text_area.clear()
-            self.translate_text_area.setText(
+            self._show_translate_text(
                 "⚠️ Translation library not installed!\n\n"
                 "Install it with:\npip install deep-translator\n\n"
                 f"Original text:\n{text}"
             )
             return
         
-        try:
-            # Show loading indicator
-            self.translate_text_area.clear()
-            self.translate_text_area.setText(f"⏳ Translating to {target.upper()}...")
-            
-            # Force GUI update
-            QApplication.processEvents()
-            
-            # Perform translation
-            translator = GoogleTranslator(source='auto', target=target)
-            translated_text = translator.translate(text)
-            
-            # Display translated text with clear formatting
-            self.translate_text_area.clear()
-            display_text = (
-                f"🌍 Language: {target.upper()}\n"
-                f"{'─' * 50}\n\n"
-                f"{translated_text}"
-            )
-            self.translate_text_area.setText(display_text)
-            
-        except Exception as e:
-            self.translate_text_area.clear()
-            error_msg = (
-                f"⚠️ Translation Error!\n\n"
-                f"Target Language: {target}\n"
-                f"Error: {str(e)}\n\n"
-                f"💡 Tips:\n"
-                f"• Check internet connection\n"
-                f"• Try a different language\n"
-                f"• Restart the application\n\n"
-                f"Original Text:\n{text[:500]}..."
-            )
-            self.translate_text_area.setText(error_msg)
+        # Cache hits (language flipped back, same snippet copied again) show without a round trip
+        cached = _translate_cache_peek(text, target)
+        if cached is not None:
+            self._translate_done(text, target, cached)
+            return
+        
+        # Show loading indicator; the translation itself runs on the thread pool
+        self._show_translate_text(f"⏳ Translating to {target.upper()}...")
+        QThreadPool.globalInstance().start(TranslateWorker(text, target, self._translate_signals))
+
+    def _show_translate_text(self, text):
+        """Replace the translate area with clipboard output, or hold it until a streaming reply ends.
+
+        Replacing the text mid-stream would let later chunks append to it, and _end_stream would
+        then cut the tail off at the reply's (now stale) start offset.
+        """
+        if self._translate_streaming:
+            self._held_translate_text = text
+        else:
+            self.translate_text_area.setPlainText(text)
+
+    def _translate_stream_done(self):
+        self._translate_streaming = False
+        self.translate_input.setEnabled(True)
+        self.translate_send_btn.setEnabled(True)
+        held, self._held_translate_text = self._held_translate_text, None
+        if held is not None:
+            self.translate_text_area.setPlainText(held)
+
+    def _translate_is_stale(self, text, target):
+        # A newer clipboard text or language was picked while this one was in flight
+        return text != self.last_clip or target != self.lang_box.currentText()
+
+    def _translate_done(self, text, target, translated_text):
+        if self._translate_is_stale(text, target):
+            return
+        # Display translated text with clear formatting
+        display_text = (
+            f"🌍 Language: {target.upper()}\n"
+            f"{'─' * 50}\n\n"
+            f"{translated_text}"
+        )
+        self._show_translate_text(display_text)
+
+    def _translate_failed(self, text, target, error):
+        if self._translate_is_stale(text, target):
+            return
+        error_msg = (
+            f"⚠️ Translation Error!\n\n"
+            f"Target Language: {target}\n"
+            f"Error: {error}\n\n"
+            f"💡 Tips:\n"
+            f"• Check internet connection\n"
+            f"• Try a different language\n"
+            f"• Restart the application\n\n"
+            f"Original Text:\n{text[:500]}..."
+        )
+        self._show_translate_text(error_msg)
 
     def ask_translate_ollama(self):
         msg = self.translate_input.text().strip()
@@ -905,13 +1763,7 @@ class AIAssistantWindow(QWidget):
         # Enhanced system prompt for detailed responses
         system_prompt = (
             f"You are an expert AI assistant. Answer the user's question in {target_lang} language ONLY.\n\n"
-            f"IMPORTANT INSTRUCTIONS:\n"
-            f"1. Provide detailed, comprehensive answers with multiple paragraphs\n"
-            f"2. Structure your answer in point-wise format with clear numbered points\n"
-            f"3. Each point should be detailed (3-5 sentences minimum)\n"
-            f"4. Include examples, explanations, and context where relevant\n"
-            f"5. Use ONLY the information from the copied text below\n"
-            f"6. If the copied text doesn't contain enough information to answer, clearly state what's missing\n"
+            f"IMPORTANT INSTRUCTIONS:\n{_TRANSLATE_RULES_TEXT}\n"
             f"7. Respond entirely in {target_lang} language\n\n"
             f"Copied Text:\n{self.last_clip}"
         )
@@ -921,64 +1773,67 @@ class AIAssistantWindow(QWidget):
         self.translate_input.setEnabled(False)
         self.translate_send_btn.setEnabled(False)
         
-        # Use QTimer to prevent UI freezing
-        QTimer.singleShot(100, lambda: self._execute_translate_ollama(system_prompt, msg, target_lang))
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Answer in {target_lang} language only: {msg}"}
+        ]
+        options = {
+            "temperature": 0.7,
+            "num_predict": 2000,
+        }
+        self._translate_streaming = True
+        start = self._begin_stream(
+            self.translate_text_area, f"<b><span style='color:#4fc3f7'>Ollama ({target_lang}):</span></b>")
+        self.translate_worker = OllamaRunnable(messages, options, target_lang)
+        self.translate_worker.signals.chunk.connect(partial(self._stream_chunk, self.translate_text_area))
+        self.translate_worker.signals.finished.connect(partial(self._on_translate_reply, start, target_lang))
+        self.translate_worker.signals.failed.connect(partial(self._on_translate_failed, start))
+        QThreadPool.globalInstance().start(self.translate_worker)
 
-    def _execute_translate_ollama(self, system_prompt, msg, target_lang):
-        try:
-            resp = requests.post(
-                f"http://{OLLAMA_HOST}:{OLLAMA_PORT}/api/chat",
-                json={
-                    "model": OLLAMA_MODEL,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": f"Answer in {target_lang} language only: {msg}"}
-                    ],
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.7,
-                        "num_predict": 2000,
-                    }
-                },
-               
-            )
-            
-            assistant_reply = ""
-            try:
-                data = resp.json()
-                if isinstance(data, dict):
-                    if "message" in data and isinstance(data["message"], dict):
-                        assistant_reply = data["message"].get("content", "")
-                    elif "choices" in data and len(data["choices"]) > 0:
-                        assistant_reply = data["choices"][0].get("message", {}).get("content", "")
-                    elif "response" in data:
-                        assistant_reply = data["response"]
-                    else:
-                        assistant_reply = json.dumps(data)
-                else:
-                    assistant_reply = str(data)
-            except Exception:
-                assistant_reply = resp.text
-            
-            # If response is not in target language, force translate it
-            if assistant_reply and HAS_TRANSLATOR:
-                try:
-                    # Detect if response needs translation
-                    if target_lang != "english":
-                        assistant_reply = GoogleTranslator(source='auto', target=target_lang).translate(assistant_reply)
-                except Exception:
-                    pass  # Keep original response if translation fails
-            
-            formatted = format_ollama_answer(assistant_reply)
-            self.translate_text_area.append(f"<b><span style='color:#4fc3f7'>Ollama ({target_lang}):</span></b>\n{formatted}")
-            
-        except Exception as e:
-            self.translate_text_area.append(f"\n⚠️ Ollama request failed: {e}")
-        finally:
-            self.translate_input.setEnabled(True)
-            self.translate_send_btn.setEnabled(True)
+    def _on_translate_reply(self, start, target_lang, assistant_reply):
+        formatted = format_ollama_answer(assistant_reply)
+        self._end_stream(
+            self.translate_text_area, start,
+            f"<b><span style='color:#4fc3f7'>Ollama ({target_lang}):</span></b>\n{formatted}"
+        )
+        self._translate_stream_done()
+
+    def _on_translate_failed(self, start, error):
+        self._end_stream(self.translate_text_area, start, f"\n⚠️ Ollama request failed: {error}")
+        self._translate_stream_done()
+
+    # --- streamed replies: raw tokens are shown live, then replaced by the formatted answer ---
+    def _begin_stream(self, area, header):
+        """Append a reply header and return the position where the streamed block starts."""
+        start = area.document().characterCount() - 1
+        area.append(header)
+        area.moveCursor(QTextCursor.End)
+        area.insertPlainText("\n")
+        return start
+
+    def _stream_chunk(self, area, chunk):
+        area.moveCursor(QTextCursor.End)
+        area.insertPlainText(chunk)
+        area.ensureCursorVisible()
+
+    def _end_stream(self, area, start, final_html=None):
+        """Remove the live-streamed block and append the final formatted reply in its place."""
+        area.setUpdatesEnabled(False)  # one repaint for the remove + append below
+        cursor = area.textCursor()
+        # the area may have been cleared while the reply was streaming
+        cursor.setPosition(min(start, area.document().characterCount() - 1))
+        cursor.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+        if final_html:
+            area.append(final_html)
+        area.setUpdatesEnabled(True)
+        area.ensureCursorVisible()
 
     def select_file(self):
+        if self._upload_pool.activeThreadCount() > 0:
+            self.upload_status.setText("⏳ Upload already in progress")
+            return
+        
         file_tuple = QFileDialog.getOpenFileName(self, "Select PDF file", "", "PDF Files (*.pdf);;All Files (*)")
         file_path = file_tuple[0] if file_tuple else None
         
@@ -989,16 +1844,18 @@ class AIAssistantWindow(QWidget):
         self.upload_status.setText(f"⏳ Uploading {os.path.basename(file_path)}...")
         self.upload_btn.setEnabled(False)
         
-        self.uploader = UploadThread(file_path)
-        self.uploader.progress.connect(self.on_upload_progress)
-        self.uploader.extracted_text_signal.connect(self.on_extracted_text)
-        self.uploader.start()
+        self.uploader = UploadRunnable(file_path)
+        self.uploader.signals.progress.connect(self.on_upload_progress)
+        self.uploader.signals.extracted_text_signal.connect(self.on_extracted_text)
+        self._upload_pool.start(self.uploader)
 
     def on_upload_progress(self, msg):
         self.upload_status.setText(msg)
 
     def on_extracted_text(self, text, s3_key):
         self.pdf_extracted_text = text or ""
+        self._doc_key = hashlib.blake2b(self.pdf_extracted_text.encode("utf-8"), digest_size=16).digest()
+        self._doc_prompt = None
         if s3_key:
             self.current_pdf_key = s3_key
         
@@ -1006,10 +1863,35 @@ class AIAssistantWindow(QWidget):
         self.upload_btn.setEnabled(True)
         self.document_send_btn.setEnabled(True)
         
+        # Drop any index still being built for the previous document, so it can't be installed
+        self._doc_index = None
+        self.index_worker = None
         if self.pdf_extracted_text:
-            self.document_text_area.setText(f"✅ Document loaded successfully! You can now ask questions.\n\nDocument ready for Q&A in {self.doc_lang_box.currentText()} language.")
+            if len(self.pdf_extracted_text) >= RETRIEVAL_MIN_CHARS:
+                # Long document: index it once, then send only the relevant excerpts per question
+                self._doc_num_ctx = document_num_ctx(len(self.pdf_extracted_text) + DOCUMENT_RULES_CHARS)
+                # Parented, so a replaced thread stays alive until it finishes and then deletes itself
+                self.index_worker = DocumentIndexThread(self.pdf_extracted_text, parent=self)
+                self.index_worker.ready.connect(self._on_document_indexed)
+                self.index_worker.finished.connect(self.index_worker.deleteLater)
+                self.index_worker.start()
+            else:
+                system = self._document_system_message(self.doc_lang_box.currentText())
+                self._doc_num_ctx = document_num_ctx(len(system))
+                warm_prompt_prefix(system, self._doc_num_ctx)
+            self.document_text_area.setPlainText(
+                "✅ Document loaded successfully! You can now ask questions.\n\n"
+                f"Document ready for Q&A in {self.doc_lang_box.currentText()} language."
+            )
         else:
-            self.document_text_area.setText("⚠️ No text extracted. PDF might be image-based or encrypted.")
+            self.document_text_area.setPlainText("⚠️ No text extracted. PDF might be image-based or encrypted.")
+
+    def _on_document_indexed(self, index):
+        if self.sender() is not self.index_worker or index is None:
+            return  # a newer document replaced this one, or indexing failed (whole document is sent)
+        self._doc_index = index
+        # Retrieval questions go one at a time, so one answer's room is enough
+        self._doc_num_ctx = document_num_ctx(RETRIEVAL_TOP_K * RETRIEVAL_CHUNK_MAX + DOCUMENT_RULES_CHARS, answers=1)
 
     def ask_document_ollama(self):
         question = self.document_input.text().strip()
@@ -1020,89 +1902,149 @@ class AIAssistantWindow(QWidget):
             self.document_text_area.append("\n⚠️ No document uploaded. Please upload a PDF first.")
             return
         
-        target_lang = self.doc_lang_box.currentText()
-        
-        # Enhanced system prompt for detailed, document-restricted responses
-        system_prompt = (
-            f"You are an expert document analyst. You must answer STRICTLY based on the document content provided below.\n\n"
-            f"CRITICAL RULES:\n"
-            f"1. Answer ONLY using information from the provided document text\n"
-            f"2. If the answer is not in the document, clearly state: 'This information is not available in the provided document'\n"
-            f"3. DO NOT use external knowledge or make assumptions beyond the document\n"
-            f"4. Provide detailed, comprehensive answers (minimum 150-200 words)\n"
-            f"5. Structure your answer in clear numbered points (use 1., 2., 3., etc.)\n"
-            f"6. Each point should include detailed explanation (3-5 sentences)\n"
-            f"7. Include relevant examples or quotes from the document\n"
-            f"8. Add a summary or conclusion at the end\n"
-            f"9. If the document contains tables, lists, or structured data, present them clearly\n\n"
-            f"DOCUMENT TEXT:\n{self.pdf_extracted_text}\n\n"
-            f"USER QUESTION: {question}\n\n"
+        self.document_input.clear()
+        self._pending_questions.append(question)
+        # While a reply is running the question waits; it is flushed (and echoed) when that reply ends,
+        # since echoing it now would land inside the streamed block that _end_stream replaces
+        if not self._document_busy:
+            self._question_timer.start()
+
+    def _document_system_message(self, target_lang):
+        """Encoded system message for target_lang over the whole loaded PDF.
+
+        Kept for the latest language only: questions neither rebuild nor re-serialize the
+        document, and at most one extra copy of it is ever held.
+        """
+        if self._doc_prompt is None or self._doc_prompt[0] != target_lang:
+            # Text beyond the context window would be dropped by Ollama anyway; don't encode or send it
+            document = self.pdf_extracted_text[:document_max_chars()]
+            self._doc_prompt = (target_lang, system_message(self._document_system_prompt(target_lang, document)))
+        return self._doc_prompt[1]
+
+    def _document_system_prompt(self, target_lang, document):
+        # The document comes first so every question (in any language) shares the same cached prefix
+        return (
+            f"DOCUMENT TEXT:\n{document}\n\n{_DOCUMENT_RULES_TEXT}\n\n"
             f"Remember: Answer ONLY based on the document above. Respond in {target_lang} language with detailed point-wise format."
         )
-        
+
+    def _document_messages(self, question, target_lang, document=None):
+        if document is None:
+            system = self._document_system_message(target_lang)
+        else:
+            system = {"role": "system", "content": self._document_system_prompt(target_lang, document)}
+        return [
+            system,
+            {"role": "user",
+             "content": f"IMPORTANT: You MUST answer in {target_lang} language ONLY. Question: {question}"}
+        ]
+
+    def _answer_key(self, question, target_lang):
+        # The document is identified by its digest, so cached answers don't pin copies of its text
+        return (OLLAMA_MODEL, self._doc_key, question, target_lang)
+
+    def _batch_limit(self, target_lang):
+        # num_ctx stays fixed per document (changing it reloads the model and drops the cached prefix)
+        return document_batch_limit(self._doc_num_ctx, len(self._document_system_message(target_lang)))
+
+    def _echo_question(self, question):
         self.document_text_area.append(f"\n\n<b><span style='color:#00e676'>You:</span></b> {question}")
-        self.document_input.clear()
-        self.document_input.setEnabled(False)
-        self.document_send_btn.setEnabled(False)
+
+    def _flush_questions(self):
+        questions, self._pending_questions = self._pending_questions, []
+        target_lang = self.doc_lang_box.currentText()
         
-        # Use QTimer to prevent UI freezing
-        QTimer.singleShot(100, lambda: self._execute_document_ollama(system_prompt, question, target_lang))
+        uncached = []
+        for question in questions:
+            cached = _answer_cache_get(self._answer_key(question, target_lang))
+            if cached is not None:
+                self._echo_question(question)
+                self._show_document_reply(target_lang, cached)
+            else:
+                uncached.append(question)
+        if not uncached:
+            return
+        # Each question retrieves its own excerpts, so with an index they go one at a time
+        limit = 1 if self._doc_index is not None else self._batch_limit(target_lang)
+        if len(uncached) > limit:
+            self._pending_questions[:0] = uncached[limit:]
+            uncached = uncached[:limit]
+        
+        options = {
+            "temperature": 0.3,
+            "num_predict": DOCUMENT_NUM_PREDICT,
+            "top_p": 0.9,
+            "num_ctx": self._doc_num_ctx,
+        }
+        self._document_busy = True
+        for question in uncached:
+            self._echo_question(question)
+        if len(uncached) > 1:
+            start = self._begin_stream(
+                self.document_text_area, f"⏳ Answering {len(uncached)} questions in one request...")
+            options["num_predict"] *= len(uncached)
+            system = self._document_system_message(target_lang)
+            self.document_worker = OllamaBatchRunnable(system, uncached, options, target_lang)
+            self.document_worker.signals.finished.connect(
+                partial(self._on_document_batch_reply, start, uncached, target_lang))
+            self.document_worker.signals.failed.connect(partial(self._on_document_failed, start))
+            QThreadPool.globalInstance().start(self.document_worker)
+            return
+        
+        question = uncached[0]
+        cache_key = self._answer_key(question, target_lang)
+        start = self._begin_stream(
+            self.document_text_area, f"<b><span style='color:#81d4fa'>Ollama ({target_lang}):</span></b>")
+        if self._doc_index is not None:
+            build_messages = partial(self._document_messages, question, target_lang)
+            self.document_worker = RetrievalRunnable(self._doc_index, question, build_messages, options, target_lang)
+        else:
+            self.document_worker = OllamaRunnable(self._document_messages(question, target_lang), options, target_lang)
+        self.document_worker.signals.chunk.connect(partial(self._stream_chunk, self.document_text_area))
+        self.document_worker.signals.finished.connect(partial(self._on_document_reply, start, cache_key, target_lang))
+        self.document_worker.signals.failed.connect(partial(self._on_document_failed, start))
+        QThreadPool.globalInstance().start(self.document_worker)
 
-    def _execute_document_ollama(self, system_prompt, question, target_lang):
-        try:
-            resp = requests.post(
-                f"http://{OLLAMA_HOST}:{OLLAMA_PORT}/api/chat",
-                json={
-                    "model": OLLAMA_MODEL,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": f"IMPORTANT: You MUST answer in {target_lang} language ONLY. Question: {question}"}
-                    ],
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.3,
-                        "num_predict": 3000,
-                        "top_p": 0.9,
-                    }
-                },
-                
+    def _on_document_reply(self, start, cache_key, target_lang, assistant_reply):
+        if assistant_reply and len(assistant_reply.strip()) >= 20:
+            _answer_cache_put(cache_key, assistant_reply)
+        # Formatted once, at the end; the streamed raw text is swapped for it in a single update
+        self._end_stream(self.document_text_area, start, self._document_reply_html(target_lang, assistant_reply))
+        self._document_done()
+
+    def _on_document_batch_reply(self, start, questions, target_lang, replies):
+        self._end_stream(self.document_text_area, start)
+        for question, assistant_reply in zip(questions, replies):
+            if len(assistant_reply.strip()) >= 20:
+                _answer_cache_put(self._answer_key(question, target_lang), assistant_reply)
+            self.document_text_area.append(f"\n<b><span style='color:#00e676'>Q:</span></b> {question}")
+            self._show_document_reply(target_lang, assistant_reply)
+        self._document_done()
+
+    def _document_reply_html(self, target_lang, assistant_reply):
+        if not assistant_reply or len(assistant_reply.strip()) < 20:
+            assistant_reply = (
+                "⚠️ The model provided an insufficient response. Please try rephrasing your question "
+                "or ensure the document contains relevant information."
             )
-            
-            assistant_reply = ""
-            try:
-                data = resp.json()
-                if isinstance(data, dict):
-                    if "message" in data and isinstance(data["message"], dict):
-                        assistant_reply = data["message"].get("content", "")
-                    elif "choices" in data and len(data["choices"]) > 0:
-                        assistant_reply = data["choices"][0].get("message", {}).get("content", "")
-                    elif "response" in data:
-                        assistant_reply = data["response"]
-                    else:
-                        assistant_reply = json.dumps(data)
-                else:
-                    assistant_reply = str(data)
-            except Exception:
-                assistant_reply = resp.text
-            
-            # Force translate to target language if not already
-            if assistant_reply and HAS_TRANSLATOR and target_lang != "english":
-                try:
-                    assistant_reply = GoogleTranslator(source='auto', target=target_lang).translate(assistant_reply)
-                except Exception:
-                    pass  # Keep original if translation fails
-            
-            if not assistant_reply or len(assistant_reply.strip()) < 20:
-                assistant_reply = f"⚠️ The model provided an insufficient response. Please try rephrasing your question or ensure the document contains relevant information."
-            
-            formatted = format_ollama_answer(assistant_reply)
-            self.document_text_area.append(f"<b><span style='color:#81d4fa'>Ollama ({target_lang}):</span></b>\n\n{formatted}\n\n{'─'*50}")
-            
-        except Exception as e:
-            self.document_text_area.append(f"\n⚠️ Ollama request failed: {e}\nPlease check if Ollama is running and try again.")
-        finally:
-            self.document_input.setEnabled(True)
-            self.document_send_btn.setEnabled(True)
+        
+        formatted = format_ollama_answer(assistant_reply)
+        return f"<b><span style='color:#81d4fa'>Ollama ({target_lang}):</span></b>\n\n{formatted}\n\n{'─'*50}"
+
+    def _show_document_reply(self, target_lang, assistant_reply):
+        self.document_text_area.append(self._document_reply_html(target_lang, assistant_reply))
+
+    def _on_document_failed(self, start, error):
+        self._end_stream(
+            self.document_text_area, start,
+            f"\n⚠️ Ollama request failed: {error}\nPlease check if Ollama is running and try again."
+        )
+        self._document_done()
+
+    def _document_done(self):
+        self._document_busy = False
+        if self._pending_questions:
+            self._question_timer.start()
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
@@ -1151,6 +2093,9 @@ def main():
         floating_button.raise_()
         print("✅ Floating button shown")
         
+        # Load the model while the user is still reaching for the button
+        threading.Thread(target=_warmup_ollama, daemon=True).start()
+        
         # Initially hide the main window
         main_window.hide()
         
@@ -0,0 +1,287 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import autofix_main
+from autofix_main import expand_paths, file_chunks, fixed_path, line_offsets
+
+
+# -------------------- line_offsets -------------------- #
+@pytest.mark.parametrize("buf, expected", [
+    (b"", [0]),
+    (b"a", [0, 1]),
+    (b"a\n", [0, 2]),
+    (b"a\nb", [0, 2, 3]),
+    (b"a\nb\n", [0, 2, 4]),
+    (b"\n\n", [0, 1, 2]),
+])
+def test_line_offsets(buf, expected):
+    assert line_offsets(buf) == expected
+
+
+def test_line_offsets_match_splitlines():
+    buf = b"first\n\nthird line\r\nlast"
+    offsets = line_offsets(buf)
+    lines = [buf[a:b] for a, b in zip(offsets, offsets[1:])]
+    assert lines == buf.splitlines(keepends=True)
+
+
+# -------------------- file_chunks -------------------- #
+def _write_lines(tmp_path, n, trailing_newline=True):
+    path = tmp_path / "code.py"
+    text = "\n".join(f"line {i}" for i in range(1, n + 1))
+    if trailing_newline and n:
+        text += "\n"
+    path.write_text(text)
+    return str(path), text
+
+
+def test_file_chunks_empty_file(tmp_path):
+    path, _ = _write_lines(tmp_path, 0)
+    assert file_chunks(path) == [(1, "")]
+
+
+def test_file_chunks_small_file_is_one_chunk(tmp_path):
+    path, text = _write_lines(tmp_path, 5)
+    assert file_chunks(path, size=10, overlap=2) == [(1, text)]
+
+
+@pytest.mark.parametrize("trailing_newline", [True, False])
+@pytest.mark.parametrize("n", [1, 9, 10, 11, 18, 19, 20, 27, 100])
+def test_file_chunks_cover_every_line_with_overlap(tmp_path, n, trailing_newline):
+    size, overlap = 10, 2
+    path, text = _write_lines(tmp_path, n, trailing_newline)
+    all_lines = text.splitlines(keepends=True)
+    chunks = file_chunks(path, size=size, overlap=overlap)
+
+    assert chunks[0][0] == 1
+    covered = set()
+    for (start, chunk), (next_start, _) in zip(chunks, chunks[1:] + [(None, None)]):
+        lines = chunk.splitlines(keepends=True)
+        assert 0 < len(lines) <= size
+        # each chunk is exactly the file's lines from its start line on
+        assert lines == all_lines[start - 1:start - 1 + len(lines)]
+        if next_start is not None:
+            assert next_start == start + size - overlap
+        covered.update(range(start, start + len(lines)))
+    assert covered == set(range(1, n + 1))
+    # the last chunk reaches the end of the file
+    assert chunks[-1][1].endswith(all_lines[-1])
+
+
+def test_file_chunks_no_chunk_is_only_overlap(tmp_path):
+    path, _ = _write_lines(tmp_path, 18)
+    chunks = file_chunks(path, size=10, overlap=2)
+    assert [start for start, _ in chunks] == [1, 9]
+
+
+# -------------------- bug_finder_chunked_async -------------------- #
+def test_bug_finder_chunked_merges_reports_with_line_ranges(tmp_path, monkeypatch):
+    path, _ = _write_lines(tmp_path, 390)
+    seen = []
+
+    def fake_bug_finder(code, source=None):
+        seen.append(source)
+        return f"report for {code.splitlines()[0]}"
+
+    monkeypatch.setattr(autofix_main, "bug_finder", fake_bug_finder)
+    report = asyncio.run(autofix_main.bug_finder_chunked_async(path))
+
+    assert report.split("\n\n") == [
+        "### Lines 1-200 (line numbers below are relative; add 0)\nreport for line 1",
+        "### Lines 181-380 (line numbers below are relative; add 180)\nreport for line 181",
+        "### Lines 361-390 (line numbers below are relative; add 360)\nreport for line 361",
+    ]
+    # each chunk gets its own semantic-cache scope
+    assert len(set(seen)) == 3
+
+
+# -------------------- expand_paths -------------------- #
+def test_expand_paths_globs_dedupes_and_skips_outputs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name in ["b.py", "a.py", "a_fixed.py", "notes.txt"]:
+        (tmp_path / name).write_text("x = 1\n")
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "c.py").write_text("y = 2\n")
+
+    assert expand_paths(["*.py", "a.py"]) == ["a.py", "b.py"]
+    assert expand_paths(["**/*.py"]) == ["a.py", "b.py", "pkg/c.py"]
+
+
+def test_expand_paths_keeps_unmatched_patterns(tmp_path, monkeypatch):
+    # reported later as "File not found" instead of silently dropped
+    monkeypatch.chdir(tmp_path)
+    assert expand_paths(["missing.py", "missing.py"]) == ["missing.py"]
+
+
+def test_fixed_path():
+    assert fixed_path("src/main.py") == f"src/main{autofix_main.OUTPUT_SUFFIX}.py"
+
+
+# -------------------- improve_file_async -------------------- #
+def test_improve_file_async_reports_missing_and_failing_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(autofix_main, "PREWARM_JOIN_TIMEOUT", 0)
+    for name in ["a.py", "b.py", "c.py"]:
+        (tmp_path / name).write_text(f"{name[0]} = 1\n")
+
+    def fake_analyze_and_fix(code):
+        if code.startswith("b"):
+            raise RuntimeError("HTTP 400")
+        return "report", code + "# fixed\n"
+
+    monkeypatch.setattr(autofix_main, "analyze_and_fix", fake_analyze_and_fix)
+    failed = asyncio.run(autofix_main.improve_file_async(["a.py", "b.py", "missing.py", "c.py"]))
+
+    assert failed == ["b.py", "missing.py"]
+    assert (tmp_path / "a_fixed.py").read_text() == "a = 1\n# fixed\n"
+    assert (tmp_path / "c_fixed.py").read_text() == "c = 1\n# fixed\n"
+    assert not (tmp_path / "b_fixed.py").exists()
+
+
+# -------------------- analyze_and_fix -------------------- #
+@pytest.fixture
+def ollama(monkeypatch):
+    """Serve canned streamed replies instead of calling Ollama, with the caches bypassed."""
+    fake = SimpleNamespace(replies=[], requests=[], streamed=[], closed=0)
+
+    def stream_generate(prompt, num_predict, system=""):
+        fake.requests.append((system, num_predict))
+        reply = fake.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        try:
+            for piece in reply:
+                if isinstance(piece, Exception):
+                    raise piece
+                fake.streamed.append(piece)
+                yield piece
+        finally:
+            fake.closed += 1
+
+    monkeypatch.setattr(autofix_main, "stream_generate", stream_generate)
+    monkeypatch.setattr(autofix_main, "_cache_lookup", lambda *args: ("key", None, None))
+    monkeypatch.setattr(autofix_main, "_cache_store", lambda key, probe, completion: None)
+    return fake
+
+
+def test_analyze_and_fix_parses_sections(ollama):
+    ollama.replies.append(["<bugs>\n1. x is unused\n</bugs>\n", "<fixed>\nprint(1)\n</fixed>"])
+    assert autofix_main.analyze_and_fix("x = 1\nprint(1)\n") == ("1. x is unused", "print(1)")
+
+
+def test_analyze_and_fix_ignores_format_restated_in_reasoning(ollama):
+    ollama.replies.append([
+        "<think>I will put bugs in <bugs> and </bugs> then code in <fixed> and</think>\n",
+        "<bugs>none</bugs><fixed>x = 1</fixed>",
+    ])
+    assert autofix_main.analyze_and_fix("x = 1\n") == ("none", "x = 1")
+
+
+def test_analyze_and_fix_falls_back_to_fixer(ollama):
+    ollama.replies.extend([["no tags at all"], ["x = 2\n", autofix_main.END_MARKER]])
+    assert autofix_main.analyze_and_fix("x = 1\n") == ("no tags at all", "x = 2")
+    systems = [system for system, _ in ollama.requests]
+    assert systems == [autofix_main.ANALYZE_AND_FIX_SYSTEM, autofix_main.BUG_FIXER_SYSTEM]
+
+
+# -------------------- _generate: stop sequences -------------------- #
+def test_stop_sequence_in_reasoning_does_not_end_the_reply(ollama):
+    ollama.replies.append([
+        "<think>I must finish with </fixed>", " and nothing else.</think>\n",
+        "<bugs>b</bugs><fixed>x = 1", "</fi", "xed>", "trailing chatter",
+    ])
+    assert autofix_main.analyze_and_fix("x = 1\n") == ("b", "x = 1")
+    # the stream was closed at the real stop sequence, split across two pieces
+    assert ollama.streamed[-1] == "xed>"
+    assert ollama.closed == 1
+
+
+def test_fixer_trims_end_marker_after_reasoning(ollama):
+    marker = autofix_main.END_MARKER
+    ollama.replies.append([f"<think>then {marker}</think>", "y = 2\n", marker, "\nmore"])
+    assert autofix_main.bug_fixer("y = 1\n", "report") == "y = 2"
+    assert "\nmore" not in ollama.streamed
+
+
+# -------------------- _generate: truncated replies -------------------- #
+def _truncated():
+    return autofix_main.TruncatedCompletion("cut off")
+
+
+def test_truncated_reply_is_retried_with_a_larger_budget(ollama, monkeypatch):
+    stored = []
+    monkeypatch.setattr(autofix_main, "_cache_store", lambda key, probe, completion: stored.append(completion))
+    ollama.replies.extend([["<think>long", _truncated()], ["<think>done</think>", "report"]])
+    assert autofix_main._generate("prompt", 256) == "report"
+    assert [n for _, n in ollama.requests] == [256, 512]
+    assert stored == ["report"]
+
+
+def test_reply_ending_inside_reasoning_counts_as_truncated(ollama):
+    ollama.replies.extend([["<think>still thinking"], ["<think>ok</think>answer"]])
+    assert autofix_main._generate("prompt", 1024) == "answer"
+    assert [n for _, n in ollama.requests] == [1024, 2048]
+
+
+def test_truncated_reply_gives_up_at_the_ceiling(ollama, monkeypatch):
+    stored = []
+    monkeypatch.setattr(autofix_main, "_cache_store", lambda key, probe, completion: stored.append(completion))
+    ollama.replies.extend([["partial", _truncated()], ["partial", _truncated()]])
+    with pytest.raises(autofix_main.TruncatedCompletion):
+        autofix_main._generate("prompt", autofix_main.MAX_NUM_PREDICT // 2)
+    assert stored == []
+
+
+def test_empty_answer_is_not_cached(ollama, monkeypatch):
+    stored = []
+    monkeypatch.setattr(autofix_main, "_cache_store", lambda key, probe, completion: stored.append(completion))
+    ollama.replies.append(["<think>nothing to say</think>\n  "])
+    with pytest.raises(RuntimeError):
+        autofix_main._generate("prompt", 1024)
+    assert stored == []
+
+
+# -------------------- response cache -------------------- #
+def test_cache_set_same_key_from_many_threads(tmp_path, monkeypatch):
+    monkeypatch.setattr(autofix_main, "CACHE_DIR", tmp_path / "cache")
+    errors = []
+
+    def store(i):
+        try:
+            for _ in range(50):
+                autofix_main._cache_set("samekey", "value")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=store, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert autofix_main._cache_get("samekey") == "value"
+    assert [p.name for p in (tmp_path / "cache").iterdir()] == ["samekey.txt"]
+
+
+# -------------------- _generate: transient failures -------------------- #
+def test_connection_reset_mid_stream_is_retried(ollama, monkeypatch):
+    monkeypatch.setattr(autofix_main.time, "sleep", lambda seconds: None)
+    reset = requests.exceptions.ChunkedEncodingError("Connection broken: connection reset by peer")
+    ollama.replies.extend([["partial", reset], ["complete answer"]])
+    assert autofix_main._generate("prompt", 1024) == "complete answer"
+    assert len(ollama.requests) == 2
+
+
+def test_client_errors_are_not_retried(ollama, monkeypatch):
+    monkeypatch.setattr(autofix_main, "_log_pool_stats", lambda: None)
+    response = requests.Response()
+    response.status_code = 400
+    ollama.replies.append(requests.HTTPError("bad request", response=response))
+    with pytest.raises(requests.HTTPError):
+        autofix_main._generate("prompt", 1024)
+    assert len(ollama.requests) == 1
@@ -0,0 +1,111 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("PyQt5.QtWidgets")
+# main.py refuses to import without a display; these tests never open a window
+os.environ.setdefault("DISPLAY", ":0")
+
+import main  # noqa: E402
+
+
+# -------------------- _translate_long -------------------- #
+@pytest.fixture
+def fake_translate(monkeypatch):
+    calls = []
+
+    def translate(text, lang):
+        calls.append(text)
+        assert len(text) <= main.TRANSLATE_MAX_CHARS
+        return text.upper()
+
+    monkeypatch.setattr(main, "_translate_cached", translate)
+    return calls
+
+
+def test_translate_long_sends_short_text_whole(fake_translate):
+    assert main._translate_long("  hello\n", "german") == "  HELLO\n"
+    assert fake_translate == ["  hello\n"]
+
+
+def test_translate_long_keeps_line_breaks_and_words(fake_translate):
+    text = "\n\n".join("line one of a paragraph\nline two of it. " * 20 for _ in range(20))
+    assert len(text) > main.TRANSLATE_MAX_CHARS
+    assert main._translate_long(text, "german") == text.upper()
+    assert len(fake_translate) > 1
+    # pieces are sent without their surrounding whitespace, and never cut inside a word
+    assert all(p == p.strip() and p.endswith(".") for p in fake_translate)
+
+
+def test_translate_paragraph_keeps_original_on_failure(monkeypatch):
+    def fail(text, lang):
+        raise RuntimeError("rejected")
+
+    monkeypatch.setattr(main, "_translate_cached", fail)
+    assert main._translate_paragraph("some text", "german") == "some text"
+    assert main._translate_paragraph("  \n", "german") == "  \n"
+
+
+# -------------------- document_num_ctx / document_batch_limit -------------------- #
+@pytest.mark.parametrize("context_length", [None, 4096, 8192, 131072])
+def test_batched_answers_fit_num_ctx(monkeypatch, context_length):
+    monkeypatch.setattr(main, "_model_context_length", context_length)
+    for prompt_chars in range(0, 200_001, 997):
+        num_ctx = main.document_num_ctx(prompt_chars)
+        limit = main.document_batch_limit(num_ctx, prompt_chars)
+        assert 1 <= limit <= main.DOCUMENT_BATCH_MAX
+        if limit > 1:
+            assert prompt_chars // 3 + limit * main.DOCUMENT_NUM_PREDICT + 512 <= num_ctx
+
+
+def test_short_documents_can_batch(monkeypatch):
+    monkeypatch.setattr(main, "_model_context_length", None)
+    num_ctx = main.document_num_ctx(20_000)
+    assert num_ctx % 2048 == 0
+    assert main.document_batch_limit(num_ctx, 20_000) == main.DOCUMENT_BATCH_MAX
+
+
+def test_small_context_models_answer_one_at_a_time(monkeypatch):
+    monkeypatch.setattr(main, "_model_context_length", 4096)
+    assert main.document_num_ctx(3000) == 4096
+    assert main.document_batch_limit(4096, 3000) == 1
+
+
+def test_single_answer_num_ctx_for_retrieval(monkeypatch):
+    monkeypatch.setattr(main, "_model_context_length", None)
+    prompt_chars = main.RETRIEVAL_TOP_K * main.RETRIEVAL_CHUNK_MAX + main.DOCUMENT_RULES_CHARS
+    num_ctx = main.document_num_ctx(prompt_chars, answers=1)
+    assert prompt_chars // 3 + main.DOCUMENT_NUM_PREDICT + 512 <= num_ctx < main.document_num_ctx(prompt_chars)
+
+
+# -------------------- chat_payload -------------------- #
+def test_chat_payload_splices_pre_encoded_messages():
+    system = main.system_message('Answer from the "document" only.\nÜbersetze nichts.')
+    messages = [system, {"role": "user", "content": "What is it about?"}]
+
+    body = json.loads(main.chat_payload(messages, {"num_ctx": 4096}, stream=False, format="json"))
+
+    assert body["model"] == main.OLLAMA_MODEL
+    assert body["stream"] is False
+    assert body["format"] == "json"
+    assert body["options"] == {"num_ctx": 4096}
+    assert body["messages"] == [
+        {"role": "system", "content": 'Answer from the "document" only.\nÜbersetze nichts.'},
+        {"role": "user", "content": "What is it about?"},
+    ]
+
+
+# -------------------- _already_in -------------------- #
+def test_already_in_first_use_from_many_threads(monkeypatch):
+    detector_factory = pytest.importorskip("langdetect.detector_factory")
+    monkeypatch.setattr(detector_factory, "_factory", None)
+    monkeypatch.setattr(main, "_langdetect_ready", False)
+    text = "Dies ist ein ganz gewöhnlicher deutscher Satz über das Wetter und die Stadt."
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: main._already_in(text, "german"), range(32)))
+
+    assert results == [True] * 32
+    assert not main._already_in("This is an ordinary English sentence about the weather.", "german")
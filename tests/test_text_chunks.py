@@ -0,0 +1,101 @@
+import pytest
+
+from text_chunks import chunk_paragraphs, split_for_translation, top_k_indices
+
+
+# -------------------- chunk_paragraphs -------------------- #
+def test_chunk_paragraphs_empty_text():
+    assert chunk_paragraphs("", 10, 50) == []
+    assert chunk_paragraphs("\n\n  \n\n", 10, 50) == []
+
+
+def test_chunk_paragraphs_merges_short_paragraphs():
+    assert chunk_paragraphs("a\n\nb\n\nc", 10, 50) == ["a\n\nb\n\nc"]
+
+
+def test_chunk_paragraphs_keeps_long_enough_paragraphs_apart():
+    first, second = "x" * 20, "y" * 20
+    assert chunk_paragraphs(f"{first}\n\n{second}", 10, 50) == [first, second]
+
+
+def test_chunk_paragraphs_never_exceeds_max_chars():
+    words = " ".join(f"word{i}" for i in range(500))
+    text = "\n\n".join([words, "short", "x" * 300, "line\n" * 80])
+    chunks = chunk_paragraphs(text, 30, 100)
+    assert chunks
+    assert all(0 < len(c) <= 100 for c in chunks)
+    # nothing but whitespace is lost
+    assert "".join("".join(chunks).split()) == "".join(text.split())
+
+
+def test_chunk_paragraphs_cuts_at_spaces_when_possible():
+    text = " ".join(["abcdefghi"] * 40)  # 399 chars, no line breaks
+    chunks = chunk_paragraphs(text, 30, 100)
+    assert all(set(c.split(" ")) == {"abcdefghi"} for c in chunks)
+
+
+def test_chunk_paragraphs_hard_cuts_unbroken_text():
+    assert chunk_paragraphs("x" * 250, 30, 100) == ["x" * 100, "x" * 100, "x" * 50]
+
+
+# -------------------- split_for_translation -------------------- #
+@pytest.mark.parametrize("text", [
+    "",
+    "short",
+    "One sentence. Two sentence! Three?\n" * 40,
+    "para one line\nline two\n\npara two " * 30,
+    "word " * 300,
+    "x" * 1000,
+    "\n\n\n" + "lead and trail " * 50 + "\n\n",
+])
+@pytest.mark.parametrize("limit", [20, 97, 500])
+def test_split_for_translation_is_lossless_and_bounded(text, limit):
+    pieces = split_for_translation(text, limit)
+    assert "".join(pieces) == text
+    assert all(0 < len(p) <= limit for p in pieces)
+
+
+def test_split_for_translation_leaves_short_text_whole():
+    assert split_for_translation("a b c", 10) == ["a b c"]
+
+
+def test_split_for_translation_prefers_line_breaks():
+    text = "first line here\nsecond line here\nthird"
+    assert split_for_translation(text, 35) == ["first line here\nsecond line here\n", "third"]
+
+
+def test_split_for_translation_prefers_sentence_ends_over_spaces():
+    text = "Alpha beta gamma. Delta epsilon zeta eta"
+    assert split_for_translation(text, 30)[0] == "Alpha beta gamma. "
+
+
+def test_split_for_translation_does_not_cut_words():
+    text = " ".join(f"w{i:03d}" for i in range(200))
+    pieces = split_for_translation(text, 50)
+    assert all(p.endswith(" ") for p in pieces[:-1])
+
+
+def test_split_for_translation_hard_cuts_without_whitespace():
+    assert split_for_translation("x" * 25, 10) == ["x" * 10, "x" * 10, "x" * 5]
+
+
+# -------------------- top_k_indices -------------------- #
+def test_top_k_indices_returns_document_order():
+    assert top_k_indices([0.1, 0.9, 0.5, 0.7, 0.2], 3) == [1, 2, 3]
+
+
+def test_top_k_indices_k_larger_than_scores():
+    assert top_k_indices([0.3, 0.1], 5) == [0, 1]
+
+
+@pytest.mark.parametrize("scores, k", [([], 3), ([0.5, 0.4], 0)])
+def test_top_k_indices_nothing_to_pick(scores, k):
+    assert top_k_indices(scores, k) == []
+
+
+def test_top_k_indices_numpy_matches_list():
+    np = pytest.importorskip("numpy")
+    scores = [0.2, 0.8, -0.1, 0.8, 0.5, 0.0, 0.9]
+    for k in range(len(scores) + 2):
+        assert top_k_indices(np.asarray(scores), k) == top_k_indices(scores, k)
+    assert top_k_indices(np.asarray([]), 3) == []
@@ -0,0 +1,85 @@
+"""
+text_chunks.py
+Pure text helpers used by main.py, kept free of Qt and network imports so they
+can be unit-tested on their own:
+- chunk_paragraphs: paragraph chunks of a long document, for retrieval
+- split_for_translation: lossless split of long text under a translate size limit
+- top_k_indices: indices of the k best retrieval scores, in document order
+"""
+
+import heapq
+import re
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n+")
+# Preferred places to cut an over-long block, best first: blank line, line break, sentence end, any space
+_TRANSLATE_BREAKS = (re.compile(r"\n\s*\n"), re.compile(r"\n"), re.compile(r"[.!?]\s"), re.compile(r"\s"))
+
+
+def chunk_paragraphs(text, min_chars, max_chars):
+    """Split text on blank lines into chunks of roughly min_chars..max_chars.
+
+    Short paragraphs are merged with their neighbours; long ones are cut at line breaks
+    (or spaces, for very long lines) so no chunk exceeds max_chars.
+    """
+    pieces = []
+    for para in _PARAGRAPH_BREAK.split(text):
+        para = para.strip()
+        while len(para) > max_chars:
+            cut = para.rfind("\n", min_chars, max_chars)
+            if cut == -1:
+                cut = para.rfind(" ", min_chars, max_chars)
+            if cut == -1:
+                cut = max_chars
+            pieces.append(para[:cut].strip())
+            para = para[cut:].strip()
+        if para:
+            pieces.append(para)
+
+    chunks = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) < min_chars and len(chunks[-1]) + len(piece) + 2 <= max_chars:
+            chunks[-1] += "\n\n" + piece
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+def split_for_translation(text, limit):
+    """Cut text into pieces of at most limit characters, so that "".join(pieces) == text.
+
+    Each cut goes after the best boundary in the back half of the window (falling back to
+    the last boundary anywhere in it), so words are only split when a window has no whitespace.
+    """
+    pieces = []
+    while len(text) > limit:
+        window = text[:limit]
+        cut = 0
+        for pattern in _TRANSLATE_BREAKS:
+            ends = [m.end() for m in pattern.finditer(window)]
+            if ends and ends[-1] > limit // 2:
+                cut = ends[-1]
+                break
+            if ends and not cut:
+                cut = ends[-1]
+        cut = cut or limit
+        pieces.append(text[:cut])
+        text = text[cut:]
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+def top_k_indices(scores, k):
+    """Indices of the k highest scores, sorted ascending (document order).
+
+    scores is a list, or a numpy array, for which argpartition selects the top k in O(n)
+    instead of sorting every score.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return []
+    if hasattr(scores, "argpartition"):
+        best = scores.argpartition(-k)[-k:].tolist()
+    else:
+        best = heapq.nlargest(k, range(len(scores)), key=scores.__getitem__)
+    return sorted(best)